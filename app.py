@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 import pandas as pd
 from io import BytesIO
@@ -6,8 +7,12 @@ from assign_lib import (
     aggregate_to_matrix,
     read_jobs_csv_from_filelike,
     assign_jobs_greedy,
+    assign_jobs_optimal,
     create_report_xlsx,
 )
+from result_cache import content_hash, get_default_cache
+from background import JobCancelled, get_default_manager
+import perf
 
 st.set_page_config(page_title="Scheduler - Horario por Área", layout="wide")
 
@@ -16,7 +21,7 @@ st.title("Scheduler: Horario por Área → Resumen y Asignación (Streamlit)")
 st.markdown(
     """
 Sube tu archivo HorarioArea (CSV separado por `;` o XLSX generado desde Excel).  
-Opcionalmente sube un CSV de Jobs (JobID,Area,Day(optional),StartHour,Duration,Quantity).
+Opcionalmente sube un CSV de Jobs (JobID,Area,Day(optional),StartHour,Duration,Quantity,Priority(optional)).
 """
 )
 
@@ -26,65 +31,164 @@ with col1:
 with col2:
     jobs_file = st.file_uploader("Sube Jobs CSV (opcional)", type=["csv"])
 
+col3, col4 = st.columns(2)
+with col3:
+    engine = st.selectbox(
+        "Motor de asignación",
+        ["greedy", "optimal"],
+        format_func=lambda e: {"greedy": "Greedy (orden del archivo)", "optimal": "Óptimo (máxima cantidad asignada)"}[e],
+    )
+with col4:
+    time_budget = st.number_input("Tiempo máximo modo óptimo (s)", min_value=1, max_value=600, value=10)
+
+# Instrumentacion de perf.py: apagada no agrega costo; la memoria (tracemalloc) hace el calculo mas lento
+col5, col6 = st.columns(2)
+with col5:
+    profile = st.checkbox("Medir rendimiento por etapa (tiempos y contadores)", value=False)
+with col6:
+    profile_memory = st.checkbox("Medir también picos de memoria (más lento)", value=False) if profile else False
+
+def run_assignment(merged_df, jobs, checkpoint=None):
+    if engine == "optimal":
+        # Con columna Priority en el CSV se maximiza la cantidad ponderada; si se agota el tiempo, resultado greedy
+        priority = "Priority" if "Priority" in jobs.columns else None
+        return assign_jobs_optimal(merged_df, jobs, priority=priority, time_budget=float(time_budget), checkpoint=checkpoint)
+    return assign_jobs_greedy(merged_df, jobs, checkpoint=checkpoint)
+
 run_button = st.button("Procesar y Generar Reporte")
 
+# Cada etapa se memoiza por hash de contenido: los reruns (p.ej. al pulsar una descarga) no recalculan nada
+cache = get_default_cache()
+horario_bytes = horario_file.getvalue() if horario_file else None
+jobs_bytes = jobs_file.getvalue() if jobs_file else None
+horario_key = content_hash(horario_bytes)
+run_key = content_hash(horario_bytes, jobs_bytes)
+job_key = (run_key, engine, time_budget)
 if run_button:
+    st.session_state["horario_run_key"] = run_key
+
+def compute_results(profiling, progress):
+    """
+    Parse -> merge -> asignacion -> Report.xlsx; corre en un hilo del pool de background.py.
+    profiling = (tiempos, memoria) solo instrumenta esta corrida: no forma parte de las claves de la cache.
+    """
+    with perf.recording(profiling[0], memory=profiling[1]) as rec:
+        results = compute_stages(progress)
+    results["perf"] = rec.report() if rec is not None else None
+    return results
+
+def compute_stages(progress):
+    progress(0, 4, "Parseando Horario...")
+    try:
+        caps_df, capjobs_df = cache.get_or_compute("parse", horario_key, lambda: parse_horario(BytesIO(horario_bytes)))
+    except Exception as e:
+        raise ValueError(f"Error parseando Horario: {e}") from e
+    progress(1, 4, "Resumen por Area/Hour...")
+    merged = cache.get_or_compute("merge", horario_key, lambda: aggregate_to_matrix(caps_df, capjobs_df))
+    results = {"merged": merged, "assignments": pd.DataFrame(), "jobs_result": pd.DataFrame(),
+               "caprem": pd.DataFrame(), "assign_error": None}
+    # Las etapas largas vuelven a llamar a progress por dentro: "Cancelar" corta a mitad de etapa
+    if jobs_bytes:
+        progress(2, 4, "Asignando jobs...")
+        try:
+            results["assignments"], results["jobs_result"], results["caprem"] = cache.get_or_compute(
+                "assign", job_key,
+                lambda: run_assignment(merged, read_jobs_csv_from_filelike(BytesIO(jobs_bytes)),
+                                       checkpoint=lambda: progress(2, 4, "Asignando jobs...")),
+            )
+        except JobCancelled:
+            raise
+        except Exception as e:
+            results["assign_error"] = e
+    progress(3, 4, "Generando Report.xlsx...")
+    results["xlsx"] = cache.get_or_compute(
+        "report", job_key,
+        lambda: create_report_xlsx(merged, results["assignments"], results["jobs_result"], results["caprem"],
+                                   checkpoint=lambda: progress(3, 4, "Generando Report.xlsx...")),
+    )
+    progress(4, 4, "Listo")
+    return results
+
+if run_button or st.session_state.get("horario_run_key") == run_key:
     if not horario_file:
         st.error("Sube primero el archivo HorarioArea (CSV o XLSX).")
+        st.stop()
+    # El calculo corre en segundo plano: la sesion sigue respondiendo y un rerun no lo reinicia
+    # Pulsar el boton con otra configuracion de medicion re-ejecuta; las etapas salen de la cache
+    entry = st.session_state.get("horario_job")
+    profiling = (profile, profile_memory)
+    if entry is None or entry[0] != job_key or (run_button and (entry[1].status in ("cancelled", "error") or entry[2] != profiling)):
+        if entry is not None:
+            entry[1].cancel()
+        entry = (job_key, get_default_manager().submit(compute_results, profiling), profiling)
+        st.session_state["horario_job"] = entry
+    job = entry[1]
+    if not job.done():
+        st.progress(job.fraction)
+        st.caption(job.message)
+        if st.button("Cancelar"):
+            job.cancel()
+        time.sleep(0.5)
+        st.rerun() if hasattr(st, "rerun") else st.experimental_rerun()
+    if job.status == "cancelled":
+        st.warning("Procesamiento cancelado. Pulsa el botón para volver a ejecutarlo.")
+        st.stop()
+    if job.status == "error":
+        st.exception(job.error)
+        st.stop()
+    results = job.result()
+    merged = results["merged"]
+    st.success("Horario procesado correctamente.")
+    st.subheader("Resumen por Area/Hour")
+    # Show dataframe with conditional formatting-like coloring via pandas style
+    st.dataframe(merged, height=400)
+
+    st.markdown("### Sobrecargas (Diferencia < 0)")
+    sobre = merged[merged["Diferencia"] < 0]
+    if sobre.empty:
+        st.info("No hay sobrecargas detectadas.")
     else:
-        with st.spinner("Parseando Horario..."):
-            try:
-                caps_df, capjobs_df = parse_horario(horario_file)
-            except Exception as e:
-                st.exception(f"Error parseando Horario: {e}")
-                st.stop()
-
-        merged = aggregate_to_matrix(caps_df, capjobs_df)
-        st.success("Horario procesado correctamente.")
-        st.subheader("Resumen por Area/Hour")
-        # Show dataframe with conditional formatting-like coloring via pandas style
-        st.dataframe(merged, height=400)
-
-        st.markdown("### Sobrecargas (Diferencia < 0)")
-        sobre = merged[merged["Diferencia"] < 0]
-        if sobre.empty:
-            st.info("No hay sobrecargas detectadas.")
+        st.dataframe(sobre, height=250)
+
+    # If jobs file present, run assignment option
+    assignments_df = results["assignments"]
+    jobs_result_df = results["jobs_result"]
+    caprem_df = results["caprem"]
+    if jobs_file:
+        st.markdown("### Asignación de Jobs (archivo Jobs subido)")
+        if results["assign_error"] is not None:
+            st.exception(f"Error leyendo Jobs o asignando: {results['assign_error']}")
         else:
-            st.dataframe(sobre, height=250)
-
-        # If jobs file present, run assignment option
-        assignments_df = pd.DataFrame()
-        jobs_result_df = pd.DataFrame()
-        caprem_df = pd.DataFrame()
-        if jobs_file:
-            st.markdown("### Asignación de Jobs (archivo Jobs subido)")
-            try:
-                jobs = read_jobs_csv_from_filelike(jobs_file)
-                assignments_df, jobs_result_df, caprem_df = assign_jobs_greedy(merged, jobs)
-                st.success("Asignación ejecutada.")
-                st.subheader("JobsResult (resumen por job)")
-                st.dataframe(jobs_result_df, height=250)
-                st.subheader("Assignment (detalle por job/hora)")
-                st.dataframe(assignments_df, height=300)
-            except Exception as e:
-                st.exception(f"Error leyendo Jobs o asignando: {e}")
-
-        # Offer downloads: CSVs and XLSX
-        st.markdown("### Descargas")
-        csv_resumen = merged.to_csv(index=False).encode("utf-8")
-        st.download_button("Descargar ResumenHorario.csv", csv_resumen, file_name="ResumenHorario.csv", mime="text/csv")
-
-        csv_sobrecargas = sobre.to_csv(index=False).encode("utf-8")
-        st.download_button("Descargar Sobrecargas.csv", csv_sobrecargas, file_name="Sobrecargas.csv", mime="text/csv")
-
-        if not assignments_df.empty:
-            st.download_button("Descargar Assignment.csv", assignments_df.to_csv(index=False).encode("utf-8"), file_name="Assignment.csv", mime="text/csv")
-            st.download_button("Descargar JobsResult.csv", jobs_result_df.to_csv(index=False).encode("utf-8"), file_name="JobsResult.csv", mime="text/csv")
-            st.download_button("Descargar CapacityRemaining.csv", caprem_df.to_csv(index=False).encode("utf-8"), file_name="CapacityRemaining.csv", mime="text/csv")
-
-        # Build full Excel report and provide download
-        with st.spinner("Generando Report.xlsx..."):
-            xlsx_bytes = create_report_xlsx(merged, assignments_df, jobs_result_df, caprem_df)
-            st.download_button("Descargar Report.xlsx", xlsx_bytes, file_name="Report.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-        st.success("Listo. Revisa los resultados y baja el reporte.")
\ No newline at end of file
+            st.success("Asignación ejecutada.")
+            st.subheader("JobsResult (resumen por job)")
+            st.dataframe(jobs_result_df, height=250)
+            st.subheader("Assignment (detalle por job/hora)")
+            st.dataframe(assignments_df, height=300)
+
+    # Offer downloads: CSVs and XLSX
+    st.markdown("### Descargas")
+    csv_resumen = merged.to_csv(index=False).encode("utf-8")
+    st.download_button("Descargar ResumenHorario.csv", csv_resumen, file_name="ResumenHorario.csv", mime="text/csv")
+
+    csv_sobrecargas = sobre.to_csv(index=False).encode("utf-8")
+    st.download_button("Descargar Sobrecargas.csv", csv_sobrecargas, file_name="Sobrecargas.csv", mime="text/csv")
+
+    if not assignments_df.empty:
+        st.download_button("Descargar Assignment.csv", assignments_df.to_csv(index=False).encode("utf-8"), file_name="Assignment.csv", mime="text/csv")
+        st.download_button("Descargar JobsResult.csv", jobs_result_df.to_csv(index=False).encode("utf-8"), file_name="JobsResult.csv", mime="text/csv")
+        st.download_button("Descargar CapacityRemaining.csv", caprem_df.to_csv(index=False).encode("utf-8"), file_name="CapacityRemaining.csv", mime="text/csv")
+
+    st.download_button("Descargar Report.xlsx", results["xlsx"], file_name="Report.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    st.success("Listo. Revisa los resultados y baja el reporte.")
+
+    with st.expander("Caché de resultados"):
+        st.dataframe(cache.stats())
+
+    if results["perf"] is not None:
+        with st.expander("Rendimiento por etapa"):
+            spans_df, counters_df = perf.report_frames(results["perf"])
+            st.dataframe(spans_df)
+            st.dataframe(counters_df)
+            st.download_button("Descargar rendimiento (JSON)", perf.to_json(results["perf"]).encode("utf-8"),
+                               file_name="rendimiento.json", mime="application/json")
@@ -0,0 +1,125 @@
+"""
+Trabajos en segundo plano para las apps Streamlit: el script no se bloquea mientras corre el calculo,
+los reruns no lo reinician y el resultado se recoge de session_state cuando termina.
+
+La funcion del trabajo recibe progress=callable(done, total, message=""); si se pidio cancelar,
+la llamada a progress lanza JobCancelled y el trabajo termina en ese punto.
+Con processes=True el calculo corre en otro proceso (no compite por el GIL con las sesiones
+de otros usuarios); la funcion y sus argumentos deben ser picklables.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """El trabajo se detuvo porque se pidio cancelarlo."""
+
+
+class ProgressReporter:
+    def __init__(self, state, cancel_event):
+        self.state = state
+        self.cancel_event = cancel_event
+
+    def __call__(self, done, total, message=""):
+        self.state.update(done=done, total=total, message=message)
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+
+def _run(fn, reporter, args, kwargs):
+    return fn(*args, progress=reporter, **kwargs)
+
+
+class Job:
+    def __init__(self, future, state, cancel_event):
+        self._future = future
+        self._state = state
+        self._cancel = cancel_event
+        self.started = time.time()
+
+    @property
+    def fraction(self):
+        total = self._state.get("total", 0)
+        return min(1.0, self._state.get("done", 0) / total) if total else 0.0
+
+    @property
+    def done_steps(self):
+        return self._state.get("done", 0), self._state.get("total", 0)
+
+    @property
+    def message(self):
+        return self._state.get("message", "")
+
+    def cancel(self):
+        self._cancel.set()
+        self._future.cancel()
+
+    def done(self):
+        return self._future.done()
+
+    @property
+    def status(self):
+        if not self._future.done():
+            return "running"
+        if self._future.cancelled() or isinstance(self._future.exception(), JobCancelled):
+            return "cancelled"
+        return "error" if self._future.exception() is not None else "done"
+
+    @property
+    def error(self):
+        return None if self.status != "error" else self._future.exception()
+
+    def result(self):
+        return self._future.result()
+
+
+class JobManager:
+    """Pool de trabajos compartido; max_workers acota cuantos calculos corren a la vez en el servidor."""
+
+    def __init__(self, max_workers=None, processes=False):
+        self.processes = processes
+        self.max_workers = max_workers
+        self._executor = None
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                if self.processes:
+                    self._manager = multiprocessing.Manager()
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers or max(1, (os.cpu_count() or 2) - 1))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers or 4, thread_name_prefix="job")
+
+    def submit(self, fn, *args, **kwargs):
+        self._start()
+        if self.processes:
+            state, cancel_event = self._manager.dict(), self._manager.Event()
+        else:
+            state, cancel_event = {}, threading.Event()
+        state.update(done=0, total=0, message="")
+        future = self._executor.submit(_run, fn, ProgressReporter(state, cancel_event), args, kwargs)
+        return Job(future, state, cancel_event)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+
+_default_managers = {}
+
+
+def get_default_manager(processes=False):
+    """Un pool por proceso del servidor, compartido por todas las sesiones (como get_default_cache)."""
+    if processes not in _default_managers:
+        _default_managers[processes] = JobManager(processes=processes)
+    return _default_managers[processes]
@@ -0,0 +1,248 @@
+"""
+Benchmarks de los dos flujos con datos de synthetic.py: tiempo (mejor de --repeat) y pico de memoria
+(tracemalloc, en una corrida aparte para no inflar los tiempos) por etapa y escala.
+
+    python bench.py --scales actual,mediana --save          # guarda bench_baseline.json
+    python bench.py --scales actual,mediana                 # compara contra el baseline
+
+Una etapa es regresion si tarda mas de baseline * (1 + --tolerance) y al menos --min-delta segundos mas,
+o si su pico de memoria crece en la misma proporcion (y al menos 1 MB). Sale con 1 si hay regresiones.
+
+    python bench.py --check                                 # backends de capacidad equivalentes
+
+--check compara capacity_backend="fenwick" contra "tensor" en casos con capacidades enteras (el camino
+del arbol, a veces con un job fraccionario que lo hace pasar a tensor) y fraccionarias, con negativas:
+mismos estados, totales, asignaciones y capacidad restante, bit a bit.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import synthetic
+
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_SCALES = ("actual", "mediana")
+MIN_MEMORY_DELTA_MB = 1.0
+
+
+def _measure(fn, repeat):
+    best = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "peak_mb": peak / (1024 * 1024)}
+
+
+def pipeline_stages(paths):
+    """Etapas de app.py / pipeline.py: (nombre, funcion sin argumentos); cada una reusa la salida de la anterior."""
+    from assign_lib import (
+        parse_horario, aggregate_to_matrix, read_jobs_csv_from_filelike, assign_jobs_greedy, assign_jobs_optimal,
+        create_report_xlsx,
+    )
+    state = {}
+
+    def parse():
+        state["caps"] = parse_horario(paths["horario_csv"])
+
+    def merge():
+        state["merged"] = aggregate_to_matrix(*state["caps"])
+
+    def jobs():
+        state["jobs"] = read_jobs_csv_from_filelike(paths["jobs"])
+
+    def assign():
+        state["assign"] = assign_jobs_greedy(state["merged"], state["jobs"])
+
+    return [
+        ("parse_horario_csv", parse),
+        ("parse_horario_xlsx", lambda: parse_horario(paths["horario_xlsx"])),
+        ("aggregate_to_matrix", merge),
+        ("read_jobs_csv", jobs),
+        ("assign_jobs_greedy", assign),
+        ("assign_jobs_greedy_fenwick",
+         lambda: assign_jobs_greedy(state["merged"], state["jobs"], capacity_backend="fenwick")),
+        ("assign_jobs_optimal", lambda: assign_jobs_optimal(state["merged"], state["jobs"])),
+        ("create_report_xlsx", lambda: create_report_xlsx(state["merged"], *state["assign"])),
+    ]
+
+
+def operator_stages(paths, scale, seed=0):
+    """Etapas de schedules_by_operator.py sobre la plantilla y req_matrix sinteticas."""
+    import pandas as pd
+    from gantt import build_gantt_html
+    from schedule_lib import build_roster_from_df, generate_schedule, validate_schedule
+
+    problem = synthetic.schedule_problem(scale, seed=seed, min_rest_hours=8)
+    roster_df = pd.read_csv(paths["roster"])
+    state = {}
+
+    def generate():
+        state["schedule"] = generate_schedule(problem)
+
+    start = datetime.combine(problem.days[0], datetime.min.time()) + timedelta(hours=6)
+    return [
+        ("build_roster_from_df", lambda: build_roster_from_df(roster_df)),
+        ("generate_schedule", generate),
+        ("validate_schedule", lambda: validate_schedule(state["schedule"], problem.max_hours_per_day,
+                                                        problem.max_consec_days, problem.min_rest_hours)),
+        ("gantt_week_detail", lambda: build_gantt_html(state["schedule"], start, start + timedelta(days=7), lod="detail")),
+        ("gantt_week_auto", lambda: build_gantt_html(state["schedule"], start, start + timedelta(days=7), lod="auto")),
+    ]
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=3, seed=0, progress=print):
+    """{"meta": ..., "results": {"<escala>/<etapa>": {"seconds", "peak_mb"}}}"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            paths = synthetic.write_dataset(os.path.join(tmp, scale), scale, seed)
+            for name, fn in pipeline_stages(paths) + operator_stages(paths, scale, seed):
+                results[f"{scale}/{name}"] = _measure(fn, repeat)
+                if progress is not None:
+                    r = results[f"{scale}/{name}"]
+                    progress(f"{scale}/{name}\t{r['seconds']:.4f} s\t{r['peak_mb']:.1f} MB")
+    meta = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "repeat": repeat,
+        "seed": seed,
+    }
+    return {"meta": meta, "results": results}
+
+
+def _capacity_case(rng, integer=False):
+    """
+    Horario de dos areas con capacidades fraccionarias (algunas negativas) y jobs fraccionarios; con
+    integer=True capacidades y cantidades enteras, salvo de vez en cuando un job fraccionario.
+    """
+    import numpy as np
+    import pandas as pd
+    hours = int(rng.integers(1, 30))
+    areas = ["a", "b"]
+    if integer:
+        caps = rng.integers(-3, 10, size=hours * len(areas)).astype(float)
+    else:
+        caps = np.round(rng.uniform(-0.3, 1.0, size=hours * len(areas)), int(rng.integers(1, 3)))
+    merged = pd.DataFrame({
+        "Area": np.repeat(areas, hours),
+        "Day": "",
+        "Hour": np.tile(np.arange(hours), len(areas)),
+        "Capacity": caps,
+    })
+    n = int(rng.integers(1, 25))
+    if integer:
+        qtys = rng.integers(1, 30, size=n).astype(float)
+        if rng.random() < 0.3:
+            qtys[rng.integers(0, n)] += 0.1
+    else:
+        qtys = np.round(rng.uniform(0.05, 3.0, size=n), int(rng.integers(1, 3)))
+    jobs = pd.DataFrame({
+        "JobID": np.arange(n),
+        "Area": rng.choice(areas, size=n),
+        "Day": "",
+        "StartHour": rng.integers(0, hours, size=n),
+        "Duration": rng.integers(1, 12, size=n),
+        "Quantity": qtys,
+    })
+    return merged, jobs
+
+
+def check_backends(cases=500, seed=0):
+    """Casos (pares enteros, impares fraccionarios) en que capacity_backend='fenwick' difiere de 'tensor'."""
+    import numpy as np
+    from assign_lib import assign_jobs_greedy
+    rng = np.random.default_rng(seed)
+    mismatched = []
+    for case in range(cases):
+        merged, jobs = _capacity_case(rng, integer=case % 2 == 0)
+        tensor = assign_jobs_greedy(merged, jobs, capacity_backend="tensor")
+        fenwick = assign_jobs_greedy(merged, jobs, capacity_backend="fenwick")
+        if not all(a.equals(b) for a, b in zip(tensor, fenwick)):
+            mismatched.append(case)
+    return mismatched
+
+
+def compare(current, baseline, tolerance=0.25, min_delta=0.005):
+    """Lista de regresiones [{"stage", "metric", "baseline", "current", "ratio"}] contra el baseline."""
+    regressions = []
+    for stage, now in current["results"].items():
+        before = baseline.get("results", {}).get(stage)
+        if before is None:
+            continue
+        for metric, floor in (("seconds", min_delta), ("peak_mb", MIN_MEMORY_DELTA_MB)):
+            b, c = before.get(metric), now.get(metric)
+            if b is None or c is None:
+                continue
+            if c > b * (1 + tolerance) and c - b >= floor:
+                regressions.append({"stage": stage, "metric": metric, "baseline": b, "current": c,
+                                    "ratio": c / b if b else float("inf")})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks por etapa con datos sinteticos y baseline JSON.")
+    parser.add_argument("--scales", default=",".join(DEFAULT_SCALES), help=f"Lista separada por comas de {','.join(synthetic.SCALES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Corridas por etapa (se guarda la mas rapida)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON de referencia")
+    parser.add_argument("--save", action="store_true", help="Guarda los resultados como nuevo baseline")
+    parser.add_argument("--out", default=None, help="Escribe tambien los resultados de esta corrida en este JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Aumento relativo tolerado antes de marcar regresion")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Segundos minimos de diferencia para marcar regresion")
+    parser.add_argument("--check", action="store_true", help="Solo verifica que los backends de capacidad den lo mismo")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        mismatched = check_backends(seed=args.seed)
+        if mismatched:
+            print(f"fenwick difiere de tensor en {len(mismatched)} casos (semilla {args.seed}): {mismatched[:10]}")
+            return 1
+        print("Backends de capacidad equivalentes en los casos enteros y fraccionarios.")
+        return 0
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in synthetic.SCALES]
+    if unknown:
+        parser.error(f"Escalas desconocidas: {unknown}")
+
+    current = run_benchmarks(scales, args.repeat, args.seed)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline guardado en {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No hay baseline en {args.baseline}; usa --save para crearlo.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance, args.min_delta)
+    for r in regressions:
+        unit = "s" if r["metric"] == "seconds" else "MB"
+        print(f"REGRESION {r['stage']} {r['metric']}: {r['baseline']:.4f} -> {r['current']:.4f} {unit} (x{r['ratio']:.2f})")
+    if not regressions:
+        print("Sin regresiones contra el baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
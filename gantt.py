@@ -0,0 +1,174 @@
+"""
+Gantt HTML/CSS del planificador (sin dependencias externas).
+La geometria de las barras se calcula por columnas y el HTML se arma con un solo join.
+Para horizontes largos hay niveles de detalle (barras agrupadas) y paginacion por ventana de fechas.
+"""
+import hashlib
+from datetime import timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import perf
+
+GANTT_CSS = """
+    <style>
+    .gantt-wrap { width:100%; overflow-x:auto; border:1px solid #ddd; padding:8px; background:#fff; }
+    .gantt-row { display:flex; align-items:center; gap:8px; margin-bottom:6px; }
+    .gantt-area { width:220px; flex:0 0 220px; font-weight:600; }
+    .gantt-bar-area { position:relative; height:36px; flex:1 1 auto; background:#f6f6f6; border-radius:4px; border:1px solid #eee; }
+    .gantt-item { position:absolute; height:28px; top:4px; border-radius:4px; padding:2px 6px; color:#fff; font-size:12px; overflow:hidden; white-space:nowrap; text-overflow:ellipsis; box-shadow: 0 1px 2px rgba(0,0,0,0.1);}
+    .gantt-legend { display:flex; gap:8px; flex-wrap:wrap; margin-bottom:8px; }
+    .gantt-legend div { padding:4px 8px; border-radius:4px; background:#efefef; font-size:12px; }
+    </style>
+    """
+LOD_LEVELS = ["auto", "detail", "operator_day", "area_day"]
+GANTT_MAX_BARS = 1500
+SUMMARY_COLOR = "hsl(210,25%,45%)"
+TIME_FORMAT = "%d-%b %H:%M"
+
+
+@lru_cache(maxsize=4096)
+def color_for(text):
+    """Color estable por texto: el tono sale de un digest (no de hash(), que cambia en cada proceso)."""
+    digest = hashlib.blake2b(str(text).encode("utf-8"), digest_size=8).digest()
+    h = int.from_bytes(digest, "big") % 360
+    return f"hsl({h},65%,40%)"
+
+
+def palette_for(names):
+    """{nombre: color} para una lista de operarios; la comparten leyenda y barras."""
+    return {name: color_for(name) for name in dict.fromkeys(str(n) for n in names)}
+
+
+def gantt_windows(date_range_start, date_range_end, days_per_page):
+    """Divide el rango en ventanas de days_per_page dias: [(inicio, fin), ...]."""
+    step = timedelta(days=max(1, int(days_per_page)))
+    windows = []
+    s = date_range_start
+    while s < date_range_end:
+        windows.append((s, min(s + step, date_range_end)))
+        s += step
+    return windows or [(date_range_start, date_range_end)]
+
+
+def _as_datetime(col):
+    return col if pd.api.types.is_datetime64_any_dtype(col) else pd.to_datetime(col)
+
+
+def _clip_to_window(df_view, date_range_start, date_range_end):
+    s = _as_datetime(df_view["Start"])
+    e = _as_datetime(df_view["End"])
+    keep = (s.notna() & e.notna() & (e > date_range_start) & (s < date_range_end)).to_numpy()
+    ops = df_view["Operario"]
+    labels = ops.where(ops.notna() & (ops.astype(str) != ""), "VACANTE").astype(str)
+    bars = pd.DataFrame({
+        "Área": df_view["Área"].to_numpy()[keep],
+        "Operario": labels.to_numpy()[keep],
+        "Turno": df_view["Turno"].to_numpy()[keep] if "Turno" in df_view.columns else None,
+        "Horas": df_view["Horas"].to_numpy()[keep] if "Horas" in df_view.columns else None,
+        "Start": s.to_numpy()[keep],
+        "End": e.to_numpy()[keep],
+    })
+    return bars
+
+
+def _merge_bars(bars, by):
+    bars = bars.assign(Dia=bars["Start"].dt.normalize(), Vacantes=(bars["Operario"] == "VACANTE").astype(int))
+    merged = bars.groupby(by + ["Dia"], sort=False, dropna=False).agg(
+        Start=("Start", "min"), End=("End", "max"), Horas=("Horas", "sum"), N=("Start", "size"), Vacantes=("Vacantes", "sum"),
+    )
+    return merged.reset_index()
+
+
+def _format_times(values):
+    # Los inicios/fines se repiten mucho (mismo turno cada dia): se formatea cada valor unico una vez
+    codes, uniques = pd.factorize(values)
+    return np.asarray(pd.DatetimeIndex(uniques).strftime(TIME_FORMAT), dtype=object)[codes].tolist()
+
+
+def _bar_strings(bars, lod, date_range_start, date_range_end, total_hours, palette):
+    s2 = bars["Start"].clip(lower=date_range_start)
+    e2 = bars["End"].clip(upper=date_range_end)
+    left_pct = (100.0 * ((s2 - date_range_start).dt.total_seconds() / 3600.0) / total_hours).tolist()
+    width_pct = np.maximum(0.5, 100.0 * ((e2 - s2).dt.total_seconds() / 3600.0) / total_hours).tolist()
+    starts = _format_times(bars["Start"])
+    ends = _format_times(bars["End"])
+    horas = bars["Horas"].tolist()
+    if lod == "area_day":
+        labels = [f"{n} asig." for n in bars["N"].tolist()]
+        colors = [SUMMARY_COLOR] * len(bars)
+        titles = [
+            f"{a} | {n} asignaciones, {v} vacantes | {s} → {e} | {h}h"
+            for a, n, v, s, e, h in zip(bars["Área"].tolist(), bars["N"].tolist(), bars["Vacantes"].tolist(), starts, ends, horas)
+        ]
+    else:
+        labels = bars["Operario"].tolist()
+        palette.update(palette_for(op for op in set(labels) if op not in palette))
+        colors = [palette[op] for op in labels]
+        if lod == "operator_day":
+            middle = [f"{n} turnos" for n in bars["N"].tolist()]
+        else:
+            middle = bars["Turno"].tolist()
+        titles = [f"{op} | {m} | {s} → {e} | {h}h" for op, m, s, e, h in zip(labels, middle, starts, ends, horas)]
+    return [
+        f"<div class='gantt-item' title='{t}' style='left:{l}%; width:{w}%; background:{c};'>{op}</div>"
+        for t, l, w, c, op in zip(titles, left_pct, width_pct, colors, labels)
+    ]
+
+
+def choose_lod(bars, max_bars=GANTT_MAX_BARS):
+    """Nivel de detalle automatico: detalle si cabe en max_bars, si no operario/dia y luego area/dia."""
+    if len(bars) <= max_bars:
+        return "detail"
+    if len(bars[["Área", "Operario"]].assign(Dia=bars["Start"].dt.normalize()).drop_duplicates()) <= max_bars:
+        return "operator_day"
+    return "area_day"
+
+
+@perf.timed()
+def build_gantt_html(df_view, date_range_start, date_range_end, lod="detail", max_bars=GANTT_MAX_BARS):
+    """
+    Construye un HTML/CSS Gantt responsivo (sin dependencias externas)
+    df_view debe contener columnas: Área, Start (datetime), End (datetime), Operario, Turno, Horas
+    lod: "detail" (una barra por asignacion), "operator_day" (una barra por area/dia/operario),
+    "area_day" (una barra resumen por area/dia) o "auto" (segun max_bars).
+    """
+    if lod not in LOD_LEVELS:
+        raise ValueError(f"Nivel de detalle desconocido '{lod}'. Opciones: {LOD_LEVELS}")
+    total_hours = max(1, int((date_range_end - date_range_start).total_seconds() / 3600))
+    parts = [GANTT_CSS, "<div class='gantt-wrap'>"]
+
+    # legend
+    unique_ops = df_view["Operario"].dropna().unique().tolist()
+    palette = palette_for(unique_ops)
+    if len(unique_ops) > 0:
+        parts.append("<div class='gantt-legend'><div><b>Legend</b></div>")
+        parts.extend(f"<div style='background:{palette[str(op)]};color:white'>{op}</div>" for op in unique_ops[:50])
+        parts.append("</div>")
+
+    bars = _clip_to_window(df_view, date_range_start, date_range_end)
+    if lod == "auto":
+        lod = choose_lod(bars, max_bars)
+    if lod == "operator_day":
+        bars = _merge_bars(bars, ["Área", "Operario"])
+    elif lod == "area_day":
+        bars = _merge_bars(bars, ["Área"])
+
+    # rows: una fila por area, en orden de aparicion en df_view
+    areas_order = list(df_view["Área"].unique())
+    named = [a for a in areas_order if pd.notna(a)]
+    codes = pd.Categorical(bars["Área"], categories=named).codes
+    html_bars = _bar_strings(bars, lod, date_range_start, date_range_end, total_hours, palette) if len(bars) else []
+    perf.count("gantt_bars", len(html_bars))
+    by_area = {a: [] for a in named}
+    for code, bar in zip(codes.tolist(), html_bars):
+        if code >= 0:
+            by_area[named[code]].append(bar)
+    for a in areas_order:
+        parts.append(f"<div class='gantt-row'><div class='gantt-area'>{a}</div><div class='gantt-bar-area'>")
+        parts.extend(by_area.get(a, ()) if pd.notna(a) else ())
+        parts.append("</div></div>")
+    parts.append("</div>")
+    return "".join(parts)
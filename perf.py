@@ -0,0 +1,167 @@
+"""
+Instrumentacion por etapa: spans de tiempo (y pico de memoria con tracemalloc, opcional) y contadores.
+
+Las funciones del pipeline se marcan con @timed o `with span("nombre")` y cuentan con count("filas", n);
+solo se mide dentro de un `with recording(...)`. Sin recording activo cada llamada cuesta una lectura
+de ContextVar, asi que la instrumentacion se queda en produccion.
+
+    with recording(memory=True) as rec:
+        caps_df, capjobs_df = parse_horario(path)
+    report = rec.report()          # dict serializable: spans + counters
+    print(to_json(report))
+
+El recorder activo es por hilo/contexto: cada trabajo de background.py mide lo suyo. tracemalloc es
+global al proceso, asi que con memory=True el pico incluye lo que asignen otros hilos en paralelo.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+_ACTIVE = contextvars.ContextVar("perf_recorder", default=None)
+_NULL_SPAN = contextlib.nullcontext()
+_MB = 1024 * 1024
+
+
+class Recorder:
+    """Spans anidados (en orden de llamada) y contadores acumulados de una corrida."""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.spans = []
+        self.counters = {}
+        self.started = datetime.now()
+        self._t0 = time.perf_counter()
+        self._stack = []
+        self._owns_tracing = False
+
+    def start_tracing(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+
+    def stop_tracing(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    @contextlib.contextmanager
+    def span(self, name):
+        record = {"name": name, "depth": len(self._stack), "offset_s": time.perf_counter() - self._t0}
+        self.spans.append(record)
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            # El pico del padre se guarda antes de reiniciarlo para medir solo este span
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._stack:
+                self._stack[-1]["_peak"] = max(self._stack[-1].get("_peak", 0), peak)
+            tracemalloc.reset_peak()
+        self._stack.append(record)
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - t0
+            self._stack.pop()
+            if tracing:
+                peak = max(record.pop("_peak", 0), tracemalloc.get_traced_memory()[1])
+                record["peak_mb"] = peak / _MB
+                if self._stack:
+                    self._stack[-1]["_peak"] = max(self._stack[-1].get("_peak", 0), peak)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        """dict JSON-serializable con meta, spans y contadores."""
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "total_seconds": time.perf_counter() - self._t0,
+            "memory": self.memory,
+            "spans": [{k: v for k, v in s.items() if not k.startswith("_")} for s in self.spans],
+            "counters": dict(self.counters),
+        }
+
+
+@contextlib.contextmanager
+def recording(recorder=True, memory=False):
+    """
+    Activa un Recorder en el contexto actual y lo devuelve. recorder puede ser uno existente (para
+    seguir acumulando en el mismo), True para crear uno nuevo, o un valor falso para no medir (devuelve None).
+    """
+    if not recorder:
+        yield None
+        return
+    rec = recorder if isinstance(recorder, Recorder) else Recorder(memory=memory)
+    token = _ACTIVE.set(rec)
+    rec.start_tracing()
+    try:
+        yield rec
+    finally:
+        rec.stop_tracing()
+        _ACTIVE.reset(token)
+
+
+def active():
+    """Recorder activo en este contexto, o None."""
+    return _ACTIVE.get()
+
+
+def span(name):
+    rec = _ACTIVE.get()
+    return _NULL_SPAN if rec is None else rec.span(name)
+
+
+def count(name, n=1):
+    rec = _ACTIVE.get()
+    if rec is not None:
+        rec.count(name, n)
+
+
+def timed(name=None):
+    """Decorador: la funcion corre dentro de span(name o su nombre) cuando hay un recording activo."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rec = _ACTIVE.get()
+            if rec is None:
+                return fn(*args, **kwargs)
+            with rec.span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def merge_reports(*reports):
+    """Une reportes de varias partes (p.ej. el proceso de generacion y la UI): spans en orden, contadores sumados."""
+    reports = [r for r in reports if r]
+    merged = {"started": min((r["started"] for r in reports), default=None),
+              "total_seconds": sum(r["total_seconds"] for r in reports),
+              "memory": any(r["memory"] for r in reports), "spans": [], "counters": {}}
+    for r in reports:
+        merged["spans"].extend(r["spans"])
+        for k, v in r["counters"].items():
+            merged["counters"][k] = merged["counters"].get(k, 0) + v
+    return merged
+
+
+def to_json(report):
+    return json.dumps(report, indent=2, ensure_ascii=False, default=str)
+
+
+def report_frames(report):
+    """(etapas, contadores) como DataFrames para mostrar en Streamlit."""
+    import pandas as pd
+    spans = pd.DataFrame({
+        "Etapa": ["  " * s["depth"] + s["name"] for s in report["spans"]],
+        "Segundos": [round(s.get("seconds", 0.0), 4) for s in report["spans"]],
+    })
+    if report["memory"]:
+        spans["Pico MB"] = [round(s["peak_mb"], 2) if "peak_mb" in s else None for s in report["spans"]]
+    counters = pd.DataFrame({"Contador": list(report["counters"]), "Valor": list(report["counters"].values())})
+    return spans, counters
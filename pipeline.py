@@ -0,0 +1,259 @@
+"""
+Pipeline Horario -> asignacion -> reporte sin Streamlit, para corridas batch.
+
+    python pipeline.py "plantas/*.csv" --jobs jobs/ --out salida/ --formats csv,xlsx --workers 4
+
+Cada Horario se procesa en un proceso del pool: parse_horario -> aggregate_to_matrix ->
+read_jobs_csv_from_filelike -> assign_jobs_greedy -> salidas CSV/XLSX/Parquet, con tiempos por etapa.
+openpyxl/xlsxwriter solo se importan si se pide XLSX.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HORARIO_EXTENSIONS = (".csv", ".xlsx", ".xls")
+OUTPUT_FORMATS = ("csv", "xlsx", "parquet")
+
+
+def expand_inputs(patterns, extensions=HORARIO_EXTENSIONS):
+    """Directorios, globs o rutas -> lista ordenada y sin duplicados de archivos."""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = [os.path.join(pattern, f) for f in os.listdir(pattern)]
+        else:
+            paths = glob.glob(pattern)
+        found.extend(p for p in paths if os.path.isfile(p) and p.lower().endswith(extensions))
+    return sorted(set(found))
+
+
+def _relative_stems(paths):
+    """Ruta relativa al directorio comun de paths, sin extension y con "_" en vez de separadores."""
+    paths = [os.path.abspath(str(p)) for p in paths]
+    if not paths:
+        return [], []
+    base = os.path.commonpath([os.path.dirname(p) for p in paths])
+    rel = [os.path.relpath(p, base) for p in paths]
+    return [os.path.splitext(r)[0].replace(os.sep, "_") for r in rel], rel
+
+
+def match_jobs(horario_path, jobs_paths, stem=None):
+    """
+    Un unico Jobs CSV aplica a todos; si hay varios se empareja por nombre (<stem>, <stem>_jobs, jobs_<stem>):
+    primero los del mismo directorio que el Horario, luego por la ruta relativa (stem de output_stems,
+    p.ej. jobs/plantA_horario.csv o jobs/plantA/horario.csv para plantA/horario.csv) y por ultimo solo
+    por el nombre del archivo. Si en el primer criterio que encuentra algo coincide mas de uno, ValueError.
+    """
+    if not jobs_paths:
+        return None
+    if len(jobs_paths) == 1:
+        return jobs_paths[0]
+    name = os.path.splitext(os.path.basename(horario_path))[0].lower()
+    folder = os.path.dirname(os.path.abspath(str(horario_path)))
+    names = [os.path.splitext(os.path.basename(p))[0].lower() for p in jobs_paths]
+    relative = [s.lower() for s in _relative_stems(jobs_paths)[0]]
+
+    def wanted(s):
+        return {s, f"{s}_jobs", f"jobs_{s}"}
+
+    rules = [
+        [p for p, n in zip(jobs_paths, names)
+         if n in wanted(name) and os.path.dirname(os.path.abspath(str(p))) == folder],
+        [p for p, r in zip(jobs_paths, relative) if stem and r in wanted(stem.lower())],
+        [p for p, n in zip(jobs_paths, names) if n in wanted(name)],
+    ]
+    for found in rules:
+        if len(found) > 1:
+            raise ValueError(f"Varios Jobs CSV coinciden con {horario_path}: {sorted(map(str, found))}")
+        if found:
+            return found[0]
+    return None
+
+
+def output_stems(horario_paths):
+    """
+    Prefijo unico de salida por Horario: la ruta relativa al directorio comun, sin extension
+    (plantA/horario.csv -> plantA_horario). Si dos entradas siguen chocando (horario.csv y horario.xlsx)
+    se les agrega la extension; si aun asi chocan, ValueError.
+    """
+    stems, rel = _relative_stems(horario_paths)
+    clashing = {s for s in stems if stems.count(s) > 1}
+    stems = [f"{s}_{os.path.splitext(r)[1].lstrip('.').lower()}" if s in clashing else s for s, r in zip(stems, rel)]
+    repeated = sorted({r for r, s in zip(rel, stems) if stems.count(s) > 1})
+    if repeated:
+        raise ValueError(f"Estos Horarios escribirian las mismas salidas: {repeated}")
+    return stems
+
+
+def _write_outputs(stem, frames, report_args, out_dir, formats, timings):
+    outputs = []
+    for fmt in formats:
+        t0 = time.perf_counter()
+        if fmt == "csv":
+            for name, df in frames.items():
+                path = os.path.join(out_dir, f"{stem}_{name}.csv")
+                df.to_csv(path, index=False)
+                outputs.append(path)
+        elif fmt == "parquet":
+            for name, df in frames.items():
+                path = os.path.join(out_dir, f"{stem}_{name}.parquet")
+                df.to_parquet(path, index=False)
+                outputs.append(path)
+        elif fmt == "xlsx":
+            from assign_lib import create_report_xlsx
+            path = os.path.join(out_dir, f"{stem}_Report.xlsx")
+            with open(path, "wb") as f:
+                f.write(create_report_xlsx(*report_args))
+            outputs.append(path)
+        else:
+            raise ValueError(f"Formato de salida desconocido '{fmt}'. Opciones: {list(OUTPUT_FORMATS)}")
+        timings[f"write_{fmt}"] = time.perf_counter() - t0
+    return outputs
+
+
+def run_pipeline(horario_path, jobs_path=None, out_dir=".", formats=("csv",), capacity_backend="tensor",
+                 engine="greedy", time_budget=10.0, stem=None):
+    """
+    Ejecuta el flujo completo para un Horario. Devuelve un dict con las rutas escritas,
+    los tiempos por etapa (segundos) y conteos basicos.
+    stem es el prefijo de los archivos de salida (por defecto, el nombre del Horario sin extension).
+    """
+    import pandas as pd
+    from assign_lib import (
+        parse_horario, aggregate_to_matrix, read_jobs_csv_from_filelike, assign_jobs_greedy, assign_jobs_optimal,
+    )
+
+    timings = {}
+    t0 = time.perf_counter()
+    caps_df, capjobs_df = parse_horario(horario_path)
+    timings["parse"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    merged = aggregate_to_matrix(caps_df, capjobs_df)
+    timings["merge"] = time.perf_counter() - t0
+
+    assignments_df = pd.DataFrame()
+    jobs_result_df = pd.DataFrame()
+    caprem_df = pd.DataFrame()
+    if jobs_path:
+        t0 = time.perf_counter()
+        jobs = read_jobs_csv_from_filelike(jobs_path)
+        timings["jobs"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        if engine == "optimal":
+            priority = "Priority" if "Priority" in jobs.columns else None
+            assignments_df, jobs_result_df, caprem_df = assign_jobs_optimal(merged, jobs, priority=priority, time_budget=time_budget)
+        else:
+            assignments_df, jobs_result_df, caprem_df = assign_jobs_greedy(merged, jobs, capacity_backend=capacity_backend)
+        timings["assign"] = time.perf_counter() - t0
+
+    frames = {"ResumenHorario": merged, "Sobrecargas": merged[merged["Diferencia"] < 0]}
+    if not assignments_df.empty:
+        frames.update({"Assignment": assignments_df, "JobsResult": jobs_result_df, "CapacityRemaining": caprem_df})
+    os.makedirs(out_dir, exist_ok=True)
+    if stem is None:
+        stem = os.path.splitext(os.path.basename(str(horario_path)))[0]
+    outputs = _write_outputs(stem, frames, (merged, assignments_df, jobs_result_df, caprem_df), out_dir, formats, timings)
+    return {
+        "horario": str(horario_path),
+        "stem": stem,
+        "jobs": jobs_path,
+        "outputs": outputs,
+        "timings": timings,
+        "rows": len(merged),
+        "overloads": int((merged["Diferencia"] < 0).sum()),
+        "jobs_count": len(jobs_result_df),
+    }
+
+
+def _run_safe(kwargs):
+    try:
+        return run_pipeline(**kwargs)
+    except Exception as e:
+        return {"horario": str(kwargs["horario_path"]), "stem": kwargs.get("stem"), "error": f"{type(e).__name__}: {e}",
+                "timings": {}}
+
+
+def run_batch(horario_paths, jobs_paths=(), out_dir=".", formats=("csv",), workers=None, capacity_backend="tensor",
+              engine="greedy", time_budget=10.0):
+    """
+    Procesa varios Horarios en un pool de procesos; los errores se reportan por archivo sin cortar el lote.
+    Cada Horario escribe con su propio prefijo (output_stems) y toma su Jobs CSV con match_jobs (ValueError
+    si el emparejamiento es ambiguo). Si se pasaron Jobs pero ninguno corresponde
+    a un Horario, ese resultado lleva "warning" (se procesa sin asignacion).
+    """
+    stems = output_stems(horario_paths)
+    tasks = [
+        {"horario_path": p, "jobs_path": match_jobs(p, list(jobs_paths), stem), "out_dir": out_dir,
+         "formats": tuple(formats), "capacity_backend": capacity_backend, "engine": engine, "time_budget": time_budget,
+         "stem": stem}
+        for p, stem in zip(horario_paths, stems)
+    ]
+    if workers == 1 or len(tasks) <= 1:
+        results = [_run_safe(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_safe, tasks))
+    for r, t in zip(results, tasks):
+        if jobs_paths and t["jobs_path"] is None:
+            r["warning"] = "ningun Jobs CSV coincide con este Horario; se proceso sin asignacion"
+    return results
+
+
+def format_timings(results):
+    stages = []
+    for r in results:
+        for s in r["timings"]:
+            if s not in stages:
+                stages.append(s)
+    lines = ["\t".join(["archivo"] + stages + ["total"])]
+    for r in results:
+        name = r.get("stem") or os.path.basename(r["horario"])
+        if "error" in r:
+            lines.append(f"{name}\tERROR {r['error']}")
+            continue
+        cells = [f"{r['timings'][s]:.3f}" if s in r["timings"] else "-" for s in stages]
+        lines.append("\t".join([name] + cells + [f"{sum(r['timings'].values()):.3f}"]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Horario -> asignacion -> reporte, sin Streamlit.")
+    parser.add_argument("horario", nargs="+", help="Archivos, directorios o globs de HorarioArea (CSV ';' / XLSX)")
+    parser.add_argument("--jobs", nargs="*", default=[], help="Jobs CSV: uno para todos, o varios emparejados por nombre")
+    parser.add_argument("--out", default="salida", help="Directorio de salida")
+    parser.add_argument("--formats", default="csv", help=f"Lista separada por comas de {','.join(OUTPUT_FORMATS)}")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto: CPUs)")
+    parser.add_argument("--capacity-backend", default="tensor", choices=["tensor", "fenwick"])
+    parser.add_argument("--engine", default="greedy", choices=["greedy", "optimal"], help="Motor de asignacion")
+    parser.add_argument("--time-budget", type=float, default=10.0, help="Segundos maximos del motor optimo por archivo")
+    args = parser.parse_args(argv)
+
+    horarios = expand_inputs(args.horario)
+    if not horarios:
+        parser.error("No se encontraron archivos de Horario.")
+    jobs = expand_inputs(args.jobs, extensions=(".csv",))
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown:
+        parser.error(f"Formatos desconocidos: {unknown}")
+
+    t0 = time.perf_counter()
+    try:
+        results = run_batch(horarios, jobs, args.out, formats, args.workers, args.capacity_backend,
+                            args.engine, args.time_budget)
+    except ValueError as e:
+        parser.error(str(e))
+    print(format_timings(results))
+    for r in results:
+        if "warning" in r:
+            print(f"AVISO {r['horario']}: {r['warning']}", file=sys.stderr)
+    print(f"{len(results)} archivos en {time.perf_counter() - t0:.2f} s")
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import perf
+
+
+def content_hash(*parts):
+    """SHA-256 del contenido de los archivos subidos (bytes o None), en orden."""
+    h = hashlib.sha256()
+    for part in parts:
+        data = b"" if part is None else bytes(part)
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def _approx_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_approx_size(v) for v in value)
+    return 0
+
+
+class StageCache:
+    """
+    Cache LRU de resultados por etapa del pipeline (parse, merge, assign, report),
+    indexado por el hash de contenido de las entradas. Se acota por numero de entradas y bytes aproximados.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def get_or_compute(self, stage, key, compute):
+        k = (stage, key)
+        with self._lock:
+            if k in self._entries:
+                self._entries.move_to_end(k)
+                self.hits[stage] = self.hits.get(stage, 0) + 1
+                perf.count(f"cache_hits.{stage}")
+                return self._entries[k]
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+        value = compute()
+        size = _approx_size(value)
+        with self._lock:
+            if k not in self._entries:
+                self._entries[k] = value
+                self._sizes[k] = size
+                self._bytes += size
+            self._evict()
+        return value
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            k, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(k)
+
+    def stats(self):
+        with self._lock:
+            stages = sorted(set(self.hits) | set(self.misses))
+            return pd.DataFrame({
+                "Etapa": stages,
+                "Aciertos": [self.hits.get(s, 0) for s in stages],
+                "Fallos": [self.misses.get(s, 0) for s in stages],
+            })
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Cache compartida por todo el proceso: sobrevive a los reruns de Streamlit."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = StageCache()
+    return _default_cache
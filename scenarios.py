@@ -0,0 +1,147 @@
+"""
+Escenarios what-if sobre un Horario ya parseado: escalar capacidad por Area/Hour y agregar/quitar jobs,
+evaluando aggregate_to_matrix + assign_jobs_greedy para cada escenario en un pool de procesos.
+Las columnas numericas base de capacidad viven en memoria compartida: los workers las leen sin copiarlas.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from assign_lib import aggregate_to_matrix, assign_jobs_greedy
+
+
+@dataclass
+class Scenario:
+    """
+    capacity_scale: {area: factor} para todas las horas del area, {(area, hour): factor} para una hora,
+    o {(None, hour): factor} para esa hora en todas las areas. Las areas se comparan sin mayusculas.
+    add_jobs: jobs extra (lista de dicts o DataFrame con las columnas de Jobs).
+    remove_job_ids: JobID a quitar del archivo base.
+    """
+    name: str
+    capacity_scale: dict = field(default_factory=dict)
+    add_jobs: object = None
+    remove_job_ids: tuple = ()
+
+
+COMPARISON_COLUMNS = ["Scenario", "Sobrecargas", "CapacityTotal", "AssignedQuantity", "UnassignedQuantity", "Assigned", "Partial", "Unassigned"]
+
+# Estado del worker: vistas sobre la memoria compartida + jobs base, fijados una vez por proceso
+_base = None
+
+
+def _pack_shared(caps_df, capjobs_df):
+    columns = {
+        "cap_hour": caps_df["Hour"].to_numpy(dtype=np.int64),
+        "cap_value": caps_df["Capacity"].to_numpy(dtype=float),
+        "job_hour": capjobs_df["Hour"].to_numpy(dtype=np.int64),
+        "job_value": capjobs_df["CapacityJob"].to_numpy(dtype=float),
+    }
+    cap_area, cap_cats = pd.factorize(pd.concat([caps_df["Area"], capjobs_df["Area"]], ignore_index=True).astype(str))
+    cap_day, day_cats = pd.factorize(pd.concat([caps_df["Day"], capjobs_df["Day"]], ignore_index=True).fillna("").astype(str))
+    n = len(caps_df)
+    columns.update({"cap_area": cap_area[:n], "job_area": cap_area[n:], "cap_day": cap_day[:n], "job_day": cap_day[n:]})
+    columns = {k: np.ascontiguousarray(v) for k, v in columns.items()}
+    size = max(1, sum(v.nbytes for v in columns.values()))
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    layout = {}
+    offset = 0
+    for k, v in columns.items():
+        np.ndarray(v.shape, dtype=v.dtype, buffer=shm.buf, offset=offset)[:] = v
+        layout[k] = (offset, v.shape, v.dtype.str)
+        offset += v.nbytes
+    return shm, {"layout": layout, "areas": list(cap_cats), "days": list(day_cats)}
+
+
+def _init_worker(shm_name, meta, jobs_df):
+    global _base
+    # Los procesos del pool comparten el resource_tracker del padre: el bloque se libera una sola vez al final
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = {
+        k: np.ndarray(shape, dtype=np.dtype(dt), buffer=shm.buf, offset=off)
+        for k, (off, shape, dt) in meta["layout"].items()
+    }
+    _base = {"shm": shm, "arrays": arrays, "areas": np.asarray(meta["areas"], dtype=object),
+             "days": np.asarray(meta["days"], dtype=object), "jobs": jobs_df}
+
+
+def _scale_factors(areas, hours, capacity_scale):
+    factors = np.ones(len(hours))
+    lower = pd.Series(areas).str.lower().to_numpy()
+    for key, factor in capacity_scale.items():
+        area, hour = key if isinstance(key, tuple) else (key, None)
+        mask = np.ones(len(hours), dtype=bool)
+        if area is not None:
+            mask &= lower == str(area).lower()
+        if hour is not None:
+            mask &= hours == int(hour)
+        factors[mask] *= float(factor)
+    return factors
+
+
+def _scenario_jobs(jobs_df, scenario):
+    jobs = jobs_df
+    if len(scenario.remove_job_ids) and "JobID" in jobs.columns:
+        jobs = jobs[~jobs["JobID"].isin(list(scenario.remove_job_ids))]
+    if scenario.add_jobs is not None:
+        extra = scenario.add_jobs if isinstance(scenario.add_jobs, pd.DataFrame) else pd.DataFrame(list(scenario.add_jobs))
+        jobs = pd.concat([jobs, extra], ignore_index=True)
+    return jobs
+
+
+def _evaluate(scenario):
+    a = _base["arrays"]
+    cap_areas = _base["areas"][a["cap_area"]]
+    factors = _scale_factors(cap_areas, a["cap_hour"], scenario.capacity_scale)
+    caps_df = pd.DataFrame({"Area": cap_areas, "Day": _base["days"][a["cap_day"]], "Hour": a["cap_hour"], "Capacity": a["cap_value"] * factors})
+    capjobs_df = pd.DataFrame({"Area": _base["areas"][a["job_area"]], "Day": _base["days"][a["job_day"]], "Hour": a["job_hour"], "CapacityJob": a["job_value"]})
+    merged = aggregate_to_matrix(caps_df, capjobs_df)
+    jobs = _scenario_jobs(_base["jobs"], scenario)
+    _, jobs_result_df, _ = assign_jobs_greedy(merged, jobs)
+    if jobs_result_df.empty:
+        requested = assigned = 0.0
+        status = pd.Series(dtype=int)
+    else:
+        requested = float(jobs_result_df["RequestedQuantity"].sum())
+        assigned = float(jobs_result_df["AssignedTotal"].sum())
+        status = jobs_result_df["Status"].value_counts()
+    return {
+        "Scenario": scenario.name,
+        "Sobrecargas": int((merged["Diferencia"] < 0).sum()),
+        "CapacityTotal": float(merged["Capacity"].sum()),
+        "AssignedQuantity": assigned,
+        "UnassignedQuantity": requested - assigned,
+        "Assigned": int(status.get("Assigned", 0)),
+        "Partial": int(status.get("Partial", 0)),
+        "Unassigned": int(status.get("Unassigned", 0)),
+    }
+
+
+def run_scenarios(caps_df, capjobs_df, jobs, scenarios, max_workers=None):
+    """
+    Evalua cada Scenario sobre el Horario parseado (salida de parse_horario) y los jobs base.
+    Devuelve una tabla comparativa con una fila por escenario, en el orden recibido.
+    """
+    global _base
+    jobs_df = jobs.reset_index(drop=True) if isinstance(jobs, pd.DataFrame) else pd.DataFrame(list(jobs or []))
+    scenarios = list(scenarios)
+    shm, meta = _pack_shared(caps_df, capjobs_df)
+    try:
+        if max_workers == 1 or len(scenarios) <= 1:
+            _init_worker(shm.name, meta, jobs_df)
+            rows = [_evaluate(s) for s in scenarios]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(shm.name, meta, jobs_df)) as pool:
+                rows = list(pool.map(_evaluate, scenarios))
+    finally:
+        if _base is not None:
+            _base["arrays"] = None
+            _base["shm"].close()
+            _base = None
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame(rows, columns=COMPARISON_COLUMNS)
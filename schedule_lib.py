@@ -0,0 +1,770 @@
+"""
+Motor del planificador de turnos por operario, sin dependencias de Streamlit.
+schedules_by_operator.py es la interfaz; este modulo se puede importar desde scripts, pruebas o procesos.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import perf
+
+# Turnos disponibles (definidos)
+DEFAULT_SHIFTS = {
+    "06-14": {"start":6, "end":14},
+    "07-15": {"start":7, "end":15},
+    "08-16": {"start":8, "end":16},
+    "09-17": {"start":9, "end":17},
+    "14-21": {"start":14, "end":21},
+    "18-00": {"start":18, "end":0},
+    "21-06": {"start":21, "end":6},
+    "AR_06-14": {"start":6, "end":14},
+    "AR_14-22": {"start":14, "end":22},
+    "AR_22-06": {"start":22, "end":6},
+    "SURF_06-21": {"start":6, "end":21},
+    "06-12": {"start":6, "end":12},
+}
+FALLBACK_SHIFT = {"start":6, "end":14}
+DEFAULT_AVAILABILITY = "Mon,Tue,Wed,Thu,Fri,Sat"
+SCHEDULE_COLUMNS = ["Fecha", "Start", "End", "Área", "Turno", "Operario", "Horas"]
+
+# -------------------------
+# Utilidades
+# -------------------------
+def parse_avail(av_str):
+    if pd.isna(av_str) or str(av_str).strip() == "":
+        return set(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"])
+    tokens = [t.strip() for t in str(av_str).replace(";", ",").split(",") if t.strip()]
+    return set([tok[:3].title() for tok in tokens])
+
+def parse_areas(a_str):
+    if pd.isna(a_str) or str(a_str).strip() == "":
+        return []
+    return [x.strip() for x in str(a_str).replace(";", ",").split(",") if x.strip()]
+
+def hours_between(start_dt, end_dt):
+    return (end_dt - start_dt).total_seconds() / 3600.0
+
+def datetime_for_day_and_hour(day, hour):
+    return datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+
+def shift_bounds(day, sh_def):
+    """(inicio, fin, horas) de un turno en un dia; los turnos con fin <= inicio terminan al dia siguiente."""
+    start_dt = datetime_for_day_and_hour(day, sh_def["start"])
+    end_dt = datetime_for_day_and_hour(day, sh_def["end"])
+    if sh_def["end"] <= sh_def["start"]:
+        end_dt += timedelta(days=1)
+    return start_dt, end_dt, hours_between(start_dt, end_dt)
+
+# -------------------------
+# Entrada tipada
+# -------------------------
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+@dataclass
+class Operator:
+    name: str
+    areas: list[str]
+    contract_hours: float = 48.0
+    availability: set[str] = field(default_factory=lambda: parse_avail(DEFAULT_AVAILABILITY))
+
+    def works_in(self, area: str) -> bool:
+        # Operarios sin area pueden cubrir cualquier area
+        return area in self.areas or len(self.areas) == 0
+
+
+@dataclass
+class CarryState:
+    """
+    Estado de dias ya comprometidos antes de `day` (el primer dia a planificar), por nombre de operario:
+    horas que ya cuentan contra el contrato, racha de dias trabajados hasta la vispera y
+    jornadas [inicio, fin) recientes para el descanso minimo. Lo arma schedule_store.ScheduleStore.
+    """
+    day: date | None = None
+    hours: dict[str, float] = field(default_factory=dict)
+    streak: dict[str, int] = field(default_factory=dict)
+    intervals: dict[str, list[tuple[datetime, datetime]]] = field(default_factory=dict)
+
+
+@dataclass
+class ScheduleProblem:
+    operators: "list[Operator] | Roster"
+    areas: list[str]
+    req_matrix: dict[tuple[str, str], int]
+    days: list[date]
+    shifts: dict[str, dict] = field(default_factory=lambda: dict(DEFAULT_SHIFTS))
+    max_hours_per_day: float = 12
+    max_consec_days: int = 6
+    min_rest_hours: float = 0
+    carry: CarryState | None = None
+
+
+def build_ops_from_df(df_ops_df) -> list[Operator]:
+    ops = []
+    for _, row in df_ops_df.iterrows():
+        name = row.get("name")
+        if pd.isna(name) or not str(name).strip():
+            continue
+        ops.append(Operator(
+            name=name,
+            areas=parse_areas(row.get("areas","")),
+            contract_hours=float(row.get("contract_hours",48)),
+            availability=parse_avail(row.get("availability",DEFAULT_AVAILABILITY)),
+        ))
+    return ops
+
+
+class Roster:
+    """
+    Plantilla en columnas: disponibilidad operario x dia de la semana, pertenencia operario x area,
+    comodines (sin areas: cubren todas) y horas de contrato como vector. Los candidatos de un
+    (area, dia) salen de una sola mascara. Se puede recorrer como lista de Operator.
+    """
+
+    def __init__(self, names, area_lists, area_code, avail, contract):
+        self.names = list(names)
+        # Listas de areas unicas y el codigo de cada operario (las plantillas repiten mucho)
+        self.area_lists = [list(a) for a in area_lists]
+        self.area_code = np.asarray(area_code, dtype=np.int64)
+        self.avail = np.asarray(avail, dtype=bool).reshape(len(self.names), len(WEEKDAYS))
+        self.contract = np.asarray(contract, dtype=float)
+        self.area_names = list(dict.fromkeys(a for lst in self.area_lists for a in lst))
+        self._area_index = {a: k for k, a in enumerate(self.area_names)}
+        by_list = np.zeros((len(self.area_lists), len(self.area_names)), dtype=bool)
+        for j, lst in enumerate(self.area_lists):
+            by_list[j, [self._area_index[a] for a in lst]] = True
+        self.member = by_list[self.area_code] if len(self.names) else np.zeros((0, len(self.area_names)), dtype=bool)
+        empty = np.array([not lst for lst in self.area_lists], dtype=bool)
+        self.wildcard = empty[self.area_code] if len(self.names) else np.zeros(0, dtype=bool)
+
+    @classmethod
+    def from_operators(cls, ops):
+        lists = {}
+        codes = [lists.setdefault(tuple(o.areas), len(lists)) for o in ops]
+        avail = [[d in o.availability for d in WEEKDAYS] for o in ops]
+        return cls([o.name for o in ops], list(lists), codes, np.array(avail, dtype=bool).reshape(len(ops), len(WEEKDAYS)),
+                   [float(o.contract_hours) for o in ops])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, i):
+        return Operator(
+            name=self.names[i], areas=list(self.area_lists[self.area_code[i]]), contract_hours=float(self.contract[i]),
+            availability={d for d, ok in zip(WEEKDAYS, self.avail[i]) if ok},
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def works_in(self, area):
+        """Mascara de operarios que pueden cubrir area."""
+        k = self._area_index.get(area)
+        return self.wildcard.copy() if k is None else self.member[:, k] | self.wildcard
+
+    def pool(self, area, dow):
+        """Indices (orden de plantilla) de quienes cubren area y estan disponibles ese dia de la semana."""
+        return np.flatnonzero(self.works_in(area) & self.avail[:, WEEKDAYS.index(dow)])
+
+    def eligible(self, areas):
+        """Matriz operario x areas (en el orden dado) de quienes pueden cubrir cada area."""
+        if not areas:
+            return np.zeros((len(self), 0), dtype=bool)
+        return np.column_stack([self.works_in(a) for a in areas])
+
+    def subset(self, idx):
+        idx = np.asarray(idx, dtype=np.int64)
+        return Roster([self.names[i] for i in idx.tolist()], self.area_lists, self.area_code[idx], self.avail[idx], self.contract[idx])
+
+
+def as_roster(operators):
+    """Roster tal cual, o convertido desde una lista de Operator."""
+    return operators if isinstance(operators, Roster) else Roster.from_operators(list(operators))
+
+
+def _parse_unique(col, parse, default):
+    """Aplica parse a cada valor unico de col (NaN -> default) y devuelve (resultados, codigo por fila)."""
+    codes, uniques = pd.factorize(col, use_na_sentinel=True)
+    parsed = [parse(u) for u in uniques]
+    if (codes < 0).any():
+        parsed.append(parse(default))
+        codes = np.where(codes < 0, len(parsed) - 1, codes)
+    return parsed, codes
+
+
+@perf.timed()
+def build_roster_from_df(df_ops_df) -> Roster:
+    """Como build_ops_from_df, pero por columnas: cada texto distinto de areas/availability se parsea una vez."""
+    n = len(df_ops_df)
+    if "name" not in df_ops_df.columns or n == 0:
+        return Roster([], [], [], np.zeros((0, len(WEEKDAYS)), dtype=bool), [])
+    names = df_ops_df["name"]
+    keep = (names.notna() & (names.astype(str).str.strip() != "")).to_numpy(dtype=bool)
+    df = df_ops_df[keep]
+    areas_col = df["areas"] if "areas" in df.columns else pd.Series([""] * len(df), index=df.index)
+    avail_col = df["availability"] if "availability" in df.columns else pd.Series([DEFAULT_AVAILABILITY] * len(df), index=df.index)
+    area_lists, area_code = _parse_unique(areas_col, parse_areas, None)
+    avail_sets, avail_code = _parse_unique(avail_col, parse_avail, None)
+    avail_rows = np.array([[d in a for d in WEEKDAYS] for a in avail_sets], dtype=bool).reshape(len(avail_sets), len(WEEKDAYS))
+    contract = df["contract_hours"].astype(float).to_numpy() if "contract_hours" in df.columns else np.full(len(df), 48.0)
+    # Listas repetidas con distinto texto ("A,B" / "A;B") comparten codigo
+    dedup = {}
+    remap = np.array([dedup.setdefault(tuple(lst), len(dedup)) for lst in area_lists], dtype=np.int64)
+    return Roster(df["name"].tolist(), list(dedup), remap[area_code] if len(area_code) else area_code,
+                  avail_rows[avail_code] if len(avail_code) else np.zeros((0, len(WEEKDAYS)), dtype=bool), contract)
+
+
+# -------------------------
+# Generador heuristico
+# -------------------------
+def _pop_free(heap, used_on, col, fits=None):
+    # Invalidacion perezosa: los operarios ya usados hoy se descartan al salir del heap.
+    # Los que no cumplen fits (solape/descanso con este turno) vuelven al heap para otros turnos.
+    rejected = []
+    chosen = None
+    while heap:
+        entry = heapq.heappop(heap)
+        if used_on[entry[-1]] == col:
+            continue
+        if fits is None or fits(entry[-1]):
+            chosen = entry[-1]
+            break
+        rejected.append(entry)
+    for entry in rejected:
+        heapq.heappush(heap, entry)
+    return chosen
+
+def _run_before(worked, col, cap, prior=None):
+    """
+    Dias seguidos trabajados justo antes de la columna col (hasta cap), para todos los operarios.
+    prior: racha arrastrada hasta la vispera de la columna 0 (CarryState), si la hay.
+    """
+    run = np.zeros(worked.shape[0], dtype=np.int64)
+    alive = np.ones(worked.shape[0], dtype=bool)
+    for k in range(1, cap+1):
+        if col - k < 0:
+            if prior is not None:
+                run += np.where(alive, prior, 0)
+            break
+        alive &= worked[:, col-k]
+        run += alive
+    return run
+
+
+class ShiftIntervals:
+    """
+    Intervalos [inicio, fin) asignados a cada operario, ordenados por inicio (en horas desde un origen).
+    Como solo se agregan intervalos que pasan fits, no se solapan y basta mirar los vecinos: O(log n).
+    """
+
+    def __init__(self, n_ops):
+        self.starts = [[] for _ in range(n_ops)]
+        self.ends = [[] for _ in range(n_ops)]
+
+    def fits(self, i, start, end, min_rest=0.0):
+        starts = self.starts[i]
+        k = bisect_left(starts, start)
+        if k > 0 and self.ends[i][k-1] + min_rest > start:
+            return False
+        return k == len(starts) or end + min_rest <= starts[k]
+
+    def add(self, i, start, end):
+        k = bisect_right(self.starts[i], start)
+        self.starts[i].insert(k, start)
+        self.ends[i].insert(k, end)
+
+
+class _OperatorState:
+    """
+    Estado del generador en arreglos: horas por operario x dia calendario, horas acumuladas,
+    racha de dias consecutivos trabajados hasta el ultimo dia cerrado e intervalos asignados.
+    """
+
+    def __init__(self, roster, days, carry=None):
+        ops = roster.names
+        self.origin = min(days).toordinal() if days else 0
+        n_cols = (max(days).toordinal() - self.origin + 1) if days else 0
+        self.hours = np.zeros((len(ops), n_cols), dtype=np.float32)
+        self.assigned_hours = np.zeros(len(ops))
+        self.contract = roster.contract.astype(float)
+        self.streak = np.zeros(len(ops), dtype=np.int64)
+        self.streak_col = None
+        self.prior = None
+        self.used_on = [-1] * len(ops)
+        self.intervals = ShiftIntervals(len(ops))
+        if carry is not None and days:
+            self._load_carry(ops, carry)
+
+    def _load_carry(self, names, carry):
+        self.assigned_hours += [carry.hours.get(n, 0.0) for n in names]
+        # La racha solo empalma si el estado es de la vispera del primer dia
+        if carry.day is not None and carry.day.toordinal() == self.origin:
+            self.prior = np.array([carry.streak.get(n, 0) for n in names], dtype=np.int64)
+            self.streak = self.prior.copy()
+            self.streak_col = -1
+        midnight = datetime.fromordinal(self.origin)
+        for i, n in enumerate(names):
+            for start, end in carry.intervals.get(n, ()):
+                self.intervals.add(i, hours_between(midnight, start), hours_between(midnight, end))
+
+    def column(self, d):
+        return d.toordinal() - self.origin
+
+    def blocked(self, col, max_consec_days):
+        # Con dias contiguos la racha se arrastra; si no, se recalcula desde la matriz
+        if self.streak_col == col - 1:
+            run = self.streak
+        else:
+            run = _run_before(self.hours > 0, col, max_consec_days, self.prior)
+        return run >= max_consec_days
+
+    def close_day(self, col):
+        worked = self.hours[:, col] > 0
+        if self.streak_col == col - 1:
+            self.streak = np.where(worked, self.streak + 1, 0)
+        else:
+            self.streak = np.where(worked, _run_before(self.hours > 0, col, col, self.prior) + 1, 0)
+        self.streak_col = col
+
+    def assign(self, i, col, shift_hours, start_h, end_h):
+        self.assigned_hours[i] += shift_hours
+        self.hours[i, col] += shift_hours
+        self.used_on[i] = col
+        self.intervals.add(i, start_h, end_h)
+
+
+@perf.timed()
+def generate_schedule(problem: ScheduleProblem, progress=None) -> pd.DataFrame:
+    """
+    Para cada dia y cada (turno, area) requerido elige, por slot, el operario disponible con menos horas:
+    primero quienes no exceden su contrato, luego quienes si; si nadie cumple los dias consecutivos
+    se relaja esa regla. Sin candidatos queda una fila con Operario=None (vacante).
+    Nunca se asigna un turno que se solape con otro del operario (turnos nocturnos que pasan al dia
+    siguiente) ni que deje menos de problem.min_rest_hours de descanso entre turnos.
+    Con problem.carry las horas, rachas y turnos de dias ya comprometidos cuentan desde el primer dia.
+
+    Dentro de un dia las horas de un operario solo cambian cuando se le asigna, y entonces ya no es
+    candidato ese dia: por eso cada (area, horas de turno) usa un heap (tier, horas, indice en plantilla)
+    construido una vez por dia, equivalente al sort estable de la lista de candidatos.
+
+    progress: callable opcional progress(dias_hechos, total_dias, mensaje), llamado al cerrar cada dia
+    (si lanza una excepcion, la generacion se corta ahi; asi se cancela desde background.py).
+    """
+    roster = as_roster(problem.operators)
+    days = list(problem.days)
+    state = _OperatorState(roster, days, problem.carry)
+    max_hours_per_day = problem.max_hours_per_day
+    max_consec_days = problem.max_consec_days
+    names = roster.names
+
+    # Candidatos por area y dia de la semana (indices en orden de plantilla): una mascara por par
+    by_area_dow = {a: {dow: roster.pool(a, dow) for dow in WEEKDAYS} for a in problem.areas}
+    empty_pool = np.zeros(0, dtype=np.int64)
+
+    # Turnos fuera del ciclo de slots: inicio/fin como desfase desde la medianoche del dia
+    shift_offsets = {}
+    for sh, _ in problem.req_matrix:
+        if sh not in shift_offsets:
+            sh_def = problem.shifts.get(sh, FALLBACK_SHIFT)
+            start = timedelta(hours=sh_def["start"])
+            end = timedelta(hours=sh_def["end"]) + (timedelta(days=1) if sh_def["end"] <= sh_def["start"] else timedelta(0))
+            shift_offsets[sh] = (start, end, hours_between(start, end))
+    requirements = [(sh, a, int(needed)) for (sh, a), needed in problem.req_matrix.items() if needed > 0]
+
+    # Solo hace falta mirar los intervalos si hay descanso minimo o algun turno puede pisar
+    # el turno mas temprano del dia siguiente; si no, un turno por dia ya lo garantiza
+    min_rest = float(problem.min_rest_hours or 0)
+    check_intervals = bool(shift_offsets) and (
+        min_rest > 0
+        or max(e for _, e, _ in shift_offsets.values()) > timedelta(days=1) + min(s for s, _, _ in shift_offsets.values())
+        # un turno arrastrado que termina despues del inicio mas temprano del primer dia
+        or any(ends and ends[-1] > min(s for s, _, _ in shift_offsets.values()).total_seconds() / 3600.0
+               for ends in state.intervals.ends)
+    )
+
+    # Contadores solo con perf activo: entradas sacadas de los heaps (elegidas o ya usadas ese dia)
+    counting = perf.active() is not None
+    popped = 0
+    cols = {k: [] for k in SCHEDULE_COLUMNS}
+    for day_no, d in enumerate(days, start=1):
+        dow = d.strftime("%a")[:3]
+        col = state.column(d)
+        midnight = datetime_for_day_and_hour(d, 0)
+        # Inicio/fin de cada turno de hoy, una vez por dia (datetime para las filas, horas para los intervalos)
+        bounds = {
+            sh: (midnight + s, midnight + e, 24.0*col + s.total_seconds()/3600.0, 24.0*col + e.total_seconds()/3600.0)
+            for sh, (s, e, _) in shift_offsets.items()
+        }
+        blocked = state.blocked(col, max_consec_days)
+        free = state.hours[:, col] == 0
+        hours_now = state.assigned_hours.copy()
+        heaps = {}
+        relaxed = {}
+        queued = 0
+
+        for sh, a, needed in requirements:
+            shift_hours = shift_offsets[sh][2]
+            start_dt, end_dt, start_h, end_h = bounds[sh]
+            rest_ok = None
+            if check_intervals:
+                rest_ok = lambda i, s=start_h, e=end_h: state.intervals.fits(i, s, e, min_rest)
+            pool = by_area_dow.get(a, {}).get(dow, empty_pool)
+            fits = len(pool) > 0 and shift_hours <= max_hours_per_day
+            for slot in range(needed):
+                chosen = None
+                if fits:
+                    key = (a, shift_hours)
+                    if key not in heaps:
+                        idx = pool[free[pool] & ~blocked[pool]]
+                        tier = (hours_now[idx] + shift_hours > state.contract[idx]).astype(np.int64)
+                        heaps[key] = list(zip(tier.tolist(), hours_now[idx].tolist(), idx.tolist()))
+                        heapq.heapify(heaps[key])
+                        queued += len(idx)
+                    chosen = _pop_free(heaps[key], state.used_on, col, rest_ok)
+                    if chosen is None:
+                        # relax rules: ignora los dias consecutivos
+                        if a not in relaxed:
+                            idx = pool[free[pool] & blocked[pool]]
+                            relaxed[a] = list(zip(hours_now[idx].tolist(), idx.tolist()))
+                            heapq.heapify(relaxed[a])
+                            queued += len(idx)
+                        chosen = _pop_free(relaxed[a], state.used_on, col, rest_ok)
+                if chosen is not None:
+                    state.assign(chosen, col, shift_hours, start_h, end_h)
+                cols["Fecha"].append(d)
+                cols["Start"].append(start_dt)
+                cols["End"].append(end_dt)
+                cols["Área"].append(a)
+                cols["Turno"].append(sh)
+                cols["Operario"].append(None if chosen is None else names[chosen])
+                cols["Horas"].append(shift_hours)
+        state.close_day(col)
+        if counting:
+            popped += queued - sum(map(len, heaps.values())) - sum(map(len, relaxed.values()))
+        if progress is not None:
+            progress(day_no, len(days), f"{d}")
+
+    if counting:
+        perf.count("slots", len(cols["Fecha"]))
+        perf.count("vacancies", cols["Operario"].count(None))
+        perf.count("candidates_popped", popped)
+    if not cols["Fecha"]:
+        return pd.DataFrame([])
+    return pd.DataFrame(cols)
+
+# -------------------------
+# Generacion por componentes de areas
+# -------------------------
+def area_components(problem: ScheduleProblem) -> list[ScheduleProblem]:
+    """
+    Divide el problema en componentes conexas del grafo operario-area: operarios que comparten
+    un area (o sin area, que cubren todas) quedan en la misma componente. Las areas requeridas que
+    no estan en problem.areas forman componentes sin operarios (solo vacantes).
+    """
+    areas = list(dict.fromkeys(problem.areas))
+    parent = {a: a for a in areas}
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    roster = as_roster(problem.operators)
+    eligible = roster.eligible(areas)
+    # Cada patron distinto de areas elegibles une sus areas una sola vez
+    for row in (np.unique(eligible, axis=0) if len(roster) else eligible):
+        mine = [areas[k] for k in np.flatnonzero(row)]
+        for a in mine[1:]:
+            ra, rb = find(mine[0]), find(a)
+            if ra != rb:
+                parent[rb] = ra
+    first_area = np.where(eligible.any(axis=1), eligible.argmax(axis=1), -1) if areas else np.full(len(roster), -1)
+    for sh, a in problem.req_matrix:
+        parent.setdefault(a, a)
+
+    groups = {}
+    for a in parent:
+        groups.setdefault(find(a), []).append(a)
+    parts = []
+    for members in groups.values():
+        member_set = set(members)
+        codes = [k for k, a in enumerate(areas) if a in member_set]
+        parts.append(ScheduleProblem(
+            operators=roster.subset(np.flatnonzero(np.isin(first_area, codes))),
+            areas=[a for a in problem.areas if a in member_set],
+            req_matrix={k: v for k, v in problem.req_matrix.items() if k[1] in member_set},
+            days=problem.days, shifts=problem.shifts,
+            max_hours_per_day=problem.max_hours_per_day, max_consec_days=problem.max_consec_days,
+            min_rest_hours=problem.min_rest_hours, carry=problem.carry,
+        ))
+    return [p for p in parts if p.req_matrix]
+
+
+def _generate_parts(parts):
+    return [generate_schedule(p) for p in parts]
+
+
+@perf.timed()
+def generate_schedule_sharded(problem: ScheduleProblem, workers=None, progress=None) -> pd.DataFrame:
+    """
+    generate_schedule por componentes de areas en paralelo (procesos); el resultado es identico
+    al de la corrida secuencial: las componentes no comparten operarios y las filas se reordenan
+    segun (dia, entrada de req_matrix, slot).
+    """
+    parts = area_components(problem)
+    if workers == 1 or len(parts) <= 1:
+        return generate_schedule(problem, progress=progress)
+
+    # Reparte las componentes en bins de trabajo parecido (operarios x slots), de mayor a menor
+    workers = min(len(parts), workers or os.cpu_count() or 1)
+    cost = [max(1, len(p.operators)) * sum(int(v) for v in p.req_matrix.values() if v > 0) for p in parts]
+    bins = [[] for _ in range(workers)]
+    load = [0] * workers
+    for k in sorted(range(len(parts)), key=lambda k: -cost[k]):
+        b = load.index(min(load))
+        bins[b].append(k)
+        load[b] += cost[k]
+    bins = [b for b in bins if b]
+    with ProcessPoolExecutor(max_workers=len(bins)) as pool:
+        futures = [pool.submit(_generate_parts, [parts[k] for k in b]) for b in bins]
+        frames = {}
+        for n, (b, f) in enumerate(zip(bins, futures), start=1):
+            frames.update(zip(b, f.result()))
+            if progress is not None:
+                progress(n, len(bins), f"Componentes de áreas: {n}/{len(bins)}")
+
+    # Posicion de cada fila en la corrida secuencial: el layout (dia, req, slot) no depende de la asignacion
+    comp_of_area = {a: k for k, p in enumerate(parts) for _, a in p.req_matrix}
+    per_day = [comp_of_area[a] for (sh, a), needed in problem.req_matrix.items() if needed > 0 for _ in range(int(needed))]
+    layout = np.tile(np.asarray(per_day, dtype=np.int64), len(problem.days))
+    pieces, positions = [], []
+    for k, frame in sorted(frames.items()):
+        if not frame.empty:
+            pieces.append(frame)
+            positions.append(np.flatnonzero(layout == k))
+    if not pieces:
+        return pd.DataFrame([])
+    merged = pd.concat(pieces, ignore_index=True)
+    merged = merged.iloc[np.argsort(np.concatenate(positions), kind="stable")].reset_index(drop=True)
+    # Una componente solo con vacantes trae Operario como object: se vuelve a inferir como en la secuencial
+    return merged.infer_objects()
+
+
+# -------------------------
+# Validaciones
+# -------------------------
+_NO_DATE = np.iinfo(np.int64).min
+# Descanso por debajo del cual validate_schedule avisa ("short_rest") aunque min_rest_hours sea menor o 0
+REST_WARNING_HOURS = 8
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _day_from_code(code):
+    return None if code == _NO_DATE else date.fromordinal(int(code) + _EPOCH_ORDINAL)
+
+def _to_seconds(col):
+    """Start/End como segundos enteros (NaT -> _NO_DATE)."""
+    values = pd.to_datetime(col).to_numpy().astype("datetime64[s]")
+    return np.where(np.isnat(values), _NO_DATE, values.astype(np.int64))
+
+def _rest_gaps(pair_op, first, last):
+    """
+    Descanso (segundos) entre cada jornada (operario, dia) y la anterior del mismo operario, ordenando
+    por inicio; negativo = solape. Barrido sobre intervalos ordenados con el maximo fin acumulado.
+    Devuelve (indices de jornada, huecos).
+    """
+    valid = np.flatnonzero((first != _NO_DATE) & (last != _NO_DATE))
+    if len(valid) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    srt = valid[np.lexsort((first[valid], pair_op[valid]))]
+    op_s = pair_op[srt]
+    base = min(first[srt].min(), last[srt].min())
+    span = int(max(first[srt].max(), last[srt].max()) - base) + 1
+    # Desplazar cada operario por span hace que el maximo acumulado se reinicie entre operarios
+    shifted = op_s.astype(np.int64) * span + (last[srt] - base)
+    prev_end = np.maximum.accumulate(shifted)[:-1] - op_s[1:].astype(np.int64) * span + base
+    same = op_s[1:] == op_s[:-1]
+    return srt[1:][same], (first[srt][1:] - prev_end)[same]
+
+@perf.timed()
+def validate_schedule(df_sch, max_hours_day, max_consec, min_rest_hours=0, rest_warning_hours=REST_WARNING_HOURS):
+    """
+    Conflictos por operario, en orden de primera aparicion: horas diarias sobre el maximo,
+    mas de una asignacion el mismo dia, dias consecutivos por encima del limite y, si hay Start/End,
+    turnos de dias distintos que se solapan o con menos de min_rest_hours de descanso entre si.
+    Devuelve una lista de dicts con "type" = daily_hours / double_shift / consec_days / overlap / rest,
+    mas "short_rest" (aviso, no conflicto) para descansos que cumplen min_rest_hours pero quedan por
+    debajo de rest_warning_hours: p.ej. noche 21-06 seguida de manana 06-14 con el minimo desactivado.
+    """
+    if df_sch is None or df_sch.empty or "Operario" not in df_sch.columns:
+        return []
+    ops = df_sch["Operario"]
+    keep = ops.notna().to_numpy()
+    if not keep.any():
+        return []
+    names = ops[keep].map(str).to_numpy(dtype=object)
+    perf.count("validated_rows", len(names))
+    fechas = pd.to_datetime(df_sch["Fecha"][keep]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    if "Horas" in df_sch.columns:
+        hrs = df_sch["Horas"][keep].astype(float).to_numpy()
+    else:
+        hrs = np.zeros(len(names))
+    timed = "Start" in df_sch.columns and "End" in df_sch.columns
+
+    op_codes, op_names = pd.factorize(names)
+    # Grupos (operario, fecha) en orden de primera aparicion; las filas del grupo en orden original
+    pair_codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([op_codes, fechas]))
+    order = np.argsort(pair_codes, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(pair_codes[order]) != 0])
+    daily = np.add.reduceat(hrs[order], starts) if len(order) else np.zeros(0)
+    counts = np.diff(np.r_[starts, len(order)])
+    pair_op = pairs.get_level_values(0).to_numpy()
+    pair_day = pairs.get_level_values(1).to_numpy()
+
+    # Racha por operario sobre fechas unicas ordenadas
+    dated = pair_day != _NO_DATE
+    u_op, u_day = pair_op[dated], pair_day[dated]
+    srt = np.lexsort((u_day, u_op))
+    u_op, u_day = u_op[srt], u_day[srt]
+    cont = np.r_[False, (u_op[1:] == u_op[:-1]) & (np.diff(u_day) == 1)]
+    run_start = np.maximum.accumulate(np.where(cont, 0, np.arange(len(u_day))))
+    consec = np.arange(len(u_day)) - run_start + 1
+
+    # Jornada de cada (operario, dia) como [primer inicio, ultimo fin); los turnos del mismo dia ya son double_shift
+    gap_pair, gaps = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if timed and len(order):
+        st_s = _to_seconds(df_sch["Start"][keep])[order]
+        en_s = _to_seconds(df_sch["End"][keep])[order]
+        missing = (st_s == _NO_DATE) | (en_s == _NO_DATE)
+        first = np.minimum.reduceat(np.where(missing, np.iinfo(np.int64).max, st_s), starts)
+        last = np.maximum.reduceat(np.where(missing, _NO_DATE, en_s), starts)
+        first[first == np.iinfo(np.int64).max] = _NO_DATE
+        gap_pair, gaps = _rest_gaps(pair_op, first, last)
+    rest_s = float(min_rest_hours or 0) * 3600.0
+    warn_s = float(rest_warning_hours or 0) * 3600.0
+
+    over = np.flatnonzero(daily > max_hours_day + 1e-6)
+    double = np.flatnonzero(counts > 1)
+    streak = np.flatnonzero(consec > max_consec)
+    overlap = np.flatnonzero(gaps < 0)
+    short = np.flatnonzero((gaps >= 0) & (gaps < rest_s - 1e-6))
+    soft = np.flatnonzero((gaps >= 0) & (gaps >= rest_s - 1e-6) & (gaps < warn_s - 1e-6))
+    # (operario, tipo, posicion) reproduce el orden del recorrido por operario
+    keys = np.r_[pair_op[over], pair_op[double], u_op[streak], pair_op[gap_pair[overlap]], pair_op[gap_pair[short]],
+                 pair_op[gap_pair[soft]]]
+    kinds = np.r_[np.zeros(len(over), int), np.ones(len(double), int), np.full(len(streak), 2),
+                  np.full(len(overlap), 3), np.full(len(short), 4), np.full(len(soft), 5)]
+    pos = np.r_[over, double, streak, gap_pair[overlap], gap_pair[short], gap_pair[soft]]
+    gap_of = dict(zip(gap_pair.tolist(), gaps.tolist()))
+    issues = []
+    for k in np.lexsort((pos, kinds, keys)):
+        name = op_names[keys[k]]
+        i = int(pos[k])
+        if kinds[k] == 0:
+            issues.append({"type":"daily_hours", "operario":name, "fecha":_day_from_code(pair_day[i]), "horas":float(daily[i])})
+        elif kinds[k] == 1:
+            issues.append({"type":"double_shift", "operario":name, "fecha":_day_from_code(pair_day[i]), "count":int(counts[i])})
+        elif kinds[k] == 2:
+            issues.append({"type":"consec_days", "operario":name, "hasta_fecha":_day_from_code(u_day[i]), "consec":int(consec[i])})
+        elif kinds[k] == 3:
+            issues.append({"type":"overlap", "operario":name, "fecha":_day_from_code(pair_day[i]), "horas":-gap_of[i] / 3600.0})
+        else:
+            issues.append({"type":"rest" if kinds[k] == 4 else "short_rest", "operario":name,
+                           "fecha":_day_from_code(pair_day[i]), "descanso":gap_of[i] / 3600.0})
+    return issues
+
+
+
+_VALIDATION_COLUMNS = ["Operario", "Fecha", "Horas", "Start", "End"]
+
+def _changed_positions(old, new):
+    """Posiciones de filas cuyo Operario/Fecha/Horas/Start/End cambio (NaN igual a NaN); None si cambio algun dtype."""
+    changed = np.zeros(len(new), dtype=bool)
+    for c in new.columns:
+        a, b = old[c], new[c]
+        if a.dtype != b.dtype:
+            return None
+        diff = np.flatnonzero(a.ne(b).to_numpy(dtype=bool, na_value=True))
+        if len(diff):
+            both_na = a.iloc[diff].isna().to_numpy() & b.iloc[diff].isna().to_numpy()
+            changed[diff[~both_na]] = True
+    return np.flatnonzero(changed)
+
+
+class IncrementalValidator:
+    """
+    validate_schedule que recuerda el horario anterior: compara el frame editado con la version previa
+    y solo revalida los operarios de las filas modificadas, usando un indice operario -> filas.
+    Agregar o borrar filas, o cambiar los limites, fuerza una validacion completa.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._params = None
+        self._rows = {}
+        self._by_op = {}
+        self._issues = []
+        self.last_revalidated = 0
+
+    def _full(self, frame, limits):
+        issues = validate_schedule(frame, *limits)
+        codes, names = pd.factorize(frame["Operario"].map(str, na_action="ignore"))
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        self._rows = {name: order[bounds[k]:bounds[k + 1]] for k, name in enumerate(names)}
+        self._by_op = {}
+        for it in issues:
+            self._by_op.setdefault(it["operario"], []).append(it)
+        self.last_revalidated = len(names)
+        return issues
+
+    def _incremental(self, frame, pos, limits):
+        col = frame.columns.get_loc("Operario")
+        old_ops, new_ops = self._frame.iloc[pos, col], frame.iloc[pos, col]
+        touched = set(old_ops.dropna().map(str)) | set(new_ops.dropna().map(str))
+        ops_values = frame["Operario"]
+        subset = []
+        for name in touched:
+            cand = np.union1d(self._rows.get(name, np.zeros(0, dtype=np.int64)), pos)
+            vals = ops_values.iloc[cand]
+            rows = cand[vals.notna().to_numpy() & (vals.map(str, na_action="ignore") == name).to_numpy(dtype=bool, na_value=False)]
+            if len(rows):
+                self._rows[name] = rows
+            else:
+                self._rows.pop(name, None)
+            self._by_op.pop(name, None)
+            subset.append(rows)
+        rows = np.unique(np.concatenate(subset)) if subset else np.zeros(0, dtype=np.int64)
+        for it in validate_schedule(frame.iloc[rows], *limits):
+            self._by_op.setdefault(it["operario"], []).append(it)
+        # Mismo orden que validate_schedule: operarios por primera aparicion
+        order = sorted(self._rows, key=lambda n: self._rows[n][0])
+        self.last_revalidated = len(touched)
+        return [it for name in order for it in self._by_op.get(name, ())]
+
+    @perf.timed("IncrementalValidator.validate")
+    def validate(self, df_sch, max_hours_day, max_consec, min_rest_hours=0, rest_warning_hours=REST_WARNING_HOURS):
+        if df_sch is None or "Operario" not in df_sch.columns:
+            self.__init__()
+            return []
+        frame = df_sch[[c for c in _VALIDATION_COLUMNS if c in df_sch.columns]].copy()
+        params = (max_hours_day, max_consec, min_rest_hours, rest_warning_hours)
+        pos = None
+        old = self._frame
+        if old is not None and params == self._params and list(old.columns) == list(frame.columns) and old.index.equals(frame.index):
+            pos = _changed_positions(old, frame)
+        if pos is None:
+            self._issues = self._full(frame, params)
+        elif len(pos):
+            self._issues = self._incremental(frame, pos, params)
+        else:
+            self.last_revalidated = 0
+        perf.count("operators_revalidated", self.last_revalidated)
+        self._frame = frame
+        self._params = params
+        return list(self._issues)
@@ -0,0 +1,404 @@
+"""
+Mejora del horario greedy con busqueda local multi-arranque en un pool de procesos.
+
+Cada worker parte del plan de generate_schedule y, con su propia semilla, prueba movimientos
+(asignar un operario a un slot, intercambiar dos operarios del mismo dia o reubicar a uno dentro del dia)
+hasta agotar el tiempo; se queda el mejor plan de todos los workers.
+Reglas duras (las de validate_schedule): area y disponibilidad del operario, un turno por dia,
+turno <= max_hours_per_day, sin solapes ni menos de min_rest_hours de descanso entre turnos,
+y nunca se agregan dias consecutivos por encima del maximo (los excesos que deja el tier relajado
+del greedy solo pueden bajar).
+Objetivo, en orden de peso: vacantes + excesos de dias consecutivos, horas sobre contrato, desbalance de horas.
+"""
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+import perf
+from schedule_lib import WEEKDAYS, as_roster, generate_schedule, generate_schedule_sharded
+from schedule_store import ScheduleStore, plan_rolling
+
+W_VACANCY = 1000.0
+W_CONSEC = 1000.0
+W_OVERTIME = 10.0
+W_BALANCE = 0.01
+
+
+@dataclass
+class SearchResult:
+    schedule: pd.DataFrame
+    before: dict
+    after: dict
+    workers: pd.DataFrame
+    replanned: list = field(default_factory=list)
+    perf: dict = field(default_factory=dict)
+
+
+def _require_unique_names(roster):
+    """
+    El horario identifica al operario solo por nombre: con nombres repetidos no se sabe de quien es cada
+    fila y la busqueda juntaria los turnos de dos personas en un mismo estado.
+    """
+    seen = set()
+    repeated = sorted({n for n in roster.names if n in seen or seen.add(n)})
+    if repeated:
+        raise ValueError(f"La busqueda local necesita nombres de operario unicos; repetidos: {repeated[:10]}")
+
+
+def _search_input(problem, schedule_df):
+    """Slots y elegibilidad como listas planas (picklables y rapidas de recorrer)."""
+    roster = as_roster(problem.operators)
+    _require_unique_names(roster)
+    names = roster.names
+    area_codes = {a: k for k, a in enumerate(dict.fromkeys(problem.areas))}
+    index = {n: i for i, n in enumerate(names)}
+    fechas = pd.to_datetime(schedule_df["Fecha"])
+    cols = [d.toordinal() for d in fechas.dt.date]
+    dows = [WEEKDAYS.index(d.strftime("%a")[:3]) for d in fechas]
+    assign = [-1 if pd.isna(n) else index.get(n, -1) for n in schedule_df["Operario"]]
+    # Inicio/fin en horas desde la medianoche de Fecha, mas 24 h por dia de calendario
+    day_hours = 24.0 * np.asarray(cols, dtype=float)
+    start_off = ((pd.to_datetime(schedule_df["Start"]) - fechas).dt.total_seconds() / 3600.0).to_numpy()
+    end_off = ((pd.to_datetime(schedule_df["End"]) - fechas).dt.total_seconds() / 3600.0).to_numpy()
+    min_rest = float(problem.min_rest_hours or 0)
+    # Dias comprometidos antes del horizonte (CarryState): horas que ya cuentan, racha y ultimas jornadas
+    carry = problem.carry
+    carried_hours = [carry.hours.get(n, 0.0) if carry else 0.0 for n in names]
+    history = [set() for _ in names]
+    prior_intervals = [[] for _ in names]
+    if carry is not None:
+        for i, n in enumerate(names):
+            if carry.day is not None:
+                history[i] = {carry.day.toordinal() - k for k in range(1, carry.streak.get(n, 0) + 1)}
+            prior_intervals[i] = [(_abs_hours(s), _abs_hours(e)) for s, e in carry.intervals.get(n, ())]
+    # Con descanso minimo o turnos que pisan el dia siguiente hay que mirar los dias vecinos
+    check_rest = bool(cols) and (min_rest > 0 or end_off.max() > 24.0 + start_off.min() or any(prior_intervals))
+    pools = {}
+    for a, k in area_codes.items():
+        for w, dow in enumerate(WEEKDAYS):
+            pools[(k, w)] = roster.pool(a, dow).tolist()
+    op_ok = [set() for _ in names]
+    for (k, w), members in pools.items():
+        for i in members:
+            op_ok[i].add((k, w))
+    return {
+        "slot_col": cols,
+        "slot_key": [(area_codes.get(a, -1), w) for a, w in zip(schedule_df["Área"], dows)],
+        "slot_hours": schedule_df["Horas"].astype(float).tolist(),
+        "assign": assign,
+        "pools": pools,
+        "op_ok": op_ok,
+        "contract": (roster.contract - np.asarray(carried_hours, dtype=float)).tolist(),
+        "history": history,
+        "prior_intervals": prior_intervals,
+        "max_hours": float(problem.max_hours_per_day),
+        "max_consec": int(problem.max_consec_days),
+        "slot_start": (day_hours + start_off).tolist(),
+        "slot_end": (day_hours + end_off).tolist(),
+        "min_rest": min_rest,
+        "rest_reach": (2 + int(min_rest // 24)) if check_rest else 0,
+    }
+
+
+def _abs_hours(dt):
+    return 24.0 * dt.toordinal() + dt.hour + dt.minute / 60.0 + dt.second / 3600.0
+
+
+def _run_length(days_worked, col, step):
+    n = 0
+    col += step
+    while col in days_worked:
+        n += 1
+        col += step
+    return n
+
+
+def _excess(run, max_consec):
+    return max(0, run - max_consec)
+
+
+def objective(data, assign):
+    """Componentes del objetivo para una asignacion slot -> operario (-1 = vacante)."""
+    n_ops = len(data["contract"])
+    hours = [0.0] * n_ops
+    worked = [set(h) for h in data["history"]]
+    vacancies = 0
+    for s, o in enumerate(assign):
+        if o < 0:
+            vacancies += 1
+            continue
+        hours[o] += data["slot_hours"][s]
+        worked[o].add(data["slot_col"][s])
+    consec = 0
+    for days_worked in worked:
+        for c in days_worked:
+            if c - 1 not in days_worked:
+                consec += _excess(_run_length(days_worked, c - 1, 1), data["max_consec"])
+    overtime = sum(max(0.0, h - c) for h, c in zip(hours, data["contract"]))
+    sumsq = sum(h * h for h in hours)
+    score = W_VACANCY * vacancies + W_CONSEC * consec + W_OVERTIME * overtime + W_BALANCE * sumsq
+    return {"score": score, "Vacantes": vacancies, "ExcesoConsecutivos": consec,
+            "HorasSobreContrato": overtime, "DesvioHoras": float(np.std(hours)) if hours else 0.0}
+
+
+class _LocalSearch:
+    def __init__(self, data, seed):
+        self.d = data
+        self.rng = random.Random(seed)
+        self.assign = list(data["assign"])
+        n_ops = len(data["contract"])
+        self.hours = [0.0] * n_ops
+        # operario -> {dia: slot}; los dias arrastrados de antes del horizonte figuran con slot -1
+        self.day_slot = [dict.fromkeys(h, -1) for h in data["history"]]
+        for s, o in enumerate(self.assign):
+            if o >= 0:
+                self.hours[o] += data["slot_hours"][s]
+                self.day_slot[o][data["slot_col"][s]] = s
+        # Solo slots que alguien podria cubrir: turno dentro del maximo diario y con operarios elegibles
+        self.fillable = [s for s in range(len(self.assign))
+                         if data["slot_hours"][s] <= data["max_hours"] and data["pools"].get(data["slot_key"][s])]
+        # Vacantes cubribles en lista + posicion, para elegir una al azar en O(1)
+        self.vacant = []
+        self.vacant_pos = {}
+        for s in self.fillable:
+            if self.assign[s] < 0:
+                self._add_vacant(s)
+
+    def _add_vacant(self, s):
+        if s not in self.vacant_pos:
+            self.vacant_pos[s] = len(self.vacant)
+            self.vacant.append(s)
+
+    def _drop_vacant(self, s):
+        k = self.vacant_pos.pop(s, None)
+        if k is not None:
+            last = self.vacant.pop()
+            if last != s:
+                self.vacant[k] = last
+                self.vacant_pos[last] = k
+
+    def _consec_delta(self, o, col, adding):
+        days_worked = self.day_slot[o]
+        left = _run_length(days_worked, col, -1)
+        right = _run_length(days_worked, col, 1)
+        m = self.d["max_consec"]
+        split = _excess(left, m) + _excess(right, m)
+        joined = _excess(left + right + 1, m)
+        return joined - split if adding else split - joined
+
+    def _rest_ok(self, o, s):
+        """El turno del slot s no se solapa ni deja poco descanso con los de o en los dias vecinos."""
+        d = self.d
+        reach = d["rest_reach"]
+        if not reach:
+            return True
+        col, start, end, rest = d["slot_col"][s], d["slot_start"][s], d["slot_end"][s], d["min_rest"]
+        days_worked = self.day_slot[o]
+        for c in range(col - reach, col + reach + 1):
+            t = days_worked.get(c) if c != col else None
+            if t is not None and t >= 0 and start < d["slot_end"][t] + rest and d["slot_start"][t] < end + rest:
+                return False
+        for prior_start, prior_end in d["prior_intervals"][o]:
+            if start < prior_end + rest and prior_start < end + rest:
+                return False
+        return True
+
+    def _hours_cost(self, changes):
+        contract = self.d["contract"]
+        cost = 0.0
+        for o, dh in changes.items():
+            h = self.hours[o]
+            cost += W_OVERTIME * (max(0.0, h + dh - contract[o]) - max(0.0, h - contract[o]))
+            cost += W_BALANCE * ((h + dh) ** 2 - h * h)
+        return cost
+
+    def propose(self):
+        """Un movimiento aleatorio; devuelve (delta, cambios) o None si no es factible."""
+        d = self.d
+        if self.vacant and self.rng.random() < 0.5:
+            s = self.rng.choice(self.vacant)
+        elif self.fillable:
+            s = self.rng.choice(self.fillable)
+        else:
+            return None
+        b = self.rng.choice(d["pools"][d["slot_key"][s]])
+        a = self.assign[s]
+        if b == a:
+            return None
+        col, hs = d["slot_col"][s], d["slot_hours"][s]
+        t = self.day_slot[b].get(col)
+        moves = []  # (slot, nuevo operario)
+        changes = {}
+        consec = 0
+        vac = 0
+        if t is None:
+            # b entra ese dia; a (si habia) sale
+            dc = self._consec_delta(b, col, adding=True)
+            if dc > 0 or not self._rest_ok(b, s):
+                return None
+            consec += dc
+            moves.append((s, b))
+            changes[b] = hs
+            if a >= 0:
+                consec += self._consec_delta(a, col, adding=False)
+                changes[a] = changes.get(a, 0.0) - hs
+            else:
+                vac -= 1
+        else:
+            ht = d["slot_hours"][t]
+            if not self._rest_ok(b, s):
+                return None
+            if a >= 0 and d["slot_key"][t] in d["op_ok"][a] and ht <= d["max_hours"] and self._rest_ok(a, t):
+                # intercambio dentro del dia: nadie cambia de dias trabajados
+                moves += [(s, b), (t, a)]
+                changes[b] = hs - ht
+                changes[a] = ht - hs
+            else:
+                # b se reubica: su slot t queda vacante, a (si habia) pierde el dia
+                moves += [(s, b), (t, -1)]
+                changes[b] = hs - ht
+                vac += 1
+                if a >= 0:
+                    consec += self._consec_delta(a, col, adding=False)
+                    changes[a] = changes.get(a, 0.0) - hs
+                else:
+                    vac -= 1
+        delta = W_VACANCY * vac + W_CONSEC * consec + self._hours_cost(changes)
+        return delta, moves, changes
+
+    def apply(self, moves, changes):
+        d = self.d
+        for s, _ in moves:
+            o = self.assign[s]
+            if o >= 0 and self.day_slot[o].get(d["slot_col"][s]) == s:
+                del self.day_slot[o][d["slot_col"][s]]
+        for s, o in moves:
+            self.assign[s] = o
+            if o >= 0:
+                self.day_slot[o][d["slot_col"][s]] = s
+                self._drop_vacant(s)
+            else:
+                self._add_vacant(s)
+        for o, dh in changes.items():
+            self.hours[o] += dh
+
+
+def _search_worker(data, seed, time_budget):
+    t0 = time.perf_counter()
+    ls = _LocalSearch(data, seed)
+    current = best = objective(data, ls.assign)["score"]
+    best_assign = list(ls.assign)
+    iterations = improvements = 0
+    while time.perf_counter() - t0 < time_budget:
+        for _ in range(256):
+            iterations += 1
+            move = ls.propose()
+            if move is None:
+                continue
+            delta, moves, changes = move
+            # Acepta movimientos que no empeoran: los laterales permiten salir de mesetas
+            if delta <= 1e-9:
+                ls.apply(moves, changes)
+                current += delta
+                if current < best - 1e-9:
+                    best = current
+                    best_assign = list(ls.assign)
+                    improvements += 1
+    elapsed = time.perf_counter() - t0
+    return {"seed": seed, "assign": best_assign, "score": objective(data, best_assign)["score"],
+            "iterations": iterations, "improvements": improvements, "elapsed": elapsed}
+
+
+@perf.timed()
+def improve_schedule(problem, schedule_df=None, time_budget=10.0, workers=None, seed=0, progress=None):
+    """
+    Mejora schedule_df (por defecto, el plan greedy de problem) con busqueda local en `workers` procesos
+    durante time_budget segundos. Devuelve SearchResult con el mejor plan (mismas filas y columnas,
+    solo cambia Operario), el objetivo antes/despues y el rendimiento de cada worker.
+    """
+    if schedule_df is None:
+        schedule_df = generate_schedule(problem)
+    if schedule_df.empty:
+        empty = {"score": 0.0, "Vacantes": 0, "ExcesoConsecutivos": 0, "HorasSobreContrato": 0.0, "DesvioHoras": 0.0}
+        return SearchResult(schedule_df, empty, empty, pd.DataFrame())
+    data = _search_input(problem, schedule_df)
+    before = objective(data, data["assign"])
+    workers = workers or 1
+    seeds = [seed + k for k in range(workers)]
+    if progress is not None:
+        progress(0, 1, f"Búsqueda local ({workers} procesos, {time_budget:g} s)")
+    if workers == 1:
+        runs = [_search_worker(data, seeds[0], time_budget)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(_search_worker, [data] * workers, seeds, [time_budget] * workers))
+    best = min(runs, key=lambda r: (r["score"], r["seed"]))
+    perf.count("search_iterations", sum(r["iterations"] for r in runs))
+    improved = schedule_df.copy()
+    names = as_roster(problem.operators).names
+    if best["score"] < before["score"] - 1e-9:
+        improved["Operario"] = pd.Series([None if o < 0 else names[o] for o in best["assign"]],
+                                         index=improved.index, dtype=schedule_df["Operario"].dtype)
+    after = objective(data, best["assign"]) if best["score"] < before["score"] - 1e-9 else before
+    if progress is not None:
+        progress(1, 1, "Búsqueda local terminada")
+    report = pd.DataFrame([
+        {"Semilla": r["seed"], "Iteraciones": r["iterations"], "Iter/s": r["iterations"] / max(r["elapsed"], 1e-9),
+         "Mejoras": r["improvements"], "Objetivo": r["score"]}
+        for r in runs
+    ])
+    return SearchResult(improved, before, after, report)
+
+
+def _plan_window(problem, search_budget, search_workers, progress, shard_workers):
+    if search_budget > 0:
+        # Antes del greedy: el error sale enseguida y no despues de generar
+        _require_unique_names(as_roster(problem.operators))
+    if shard_workers and shard_workers > 1:
+        schedule_df = generate_schedule_sharded(problem, workers=shard_workers, progress=progress)
+    else:
+        day_progress = None
+        if progress is not None:
+            day_progress = lambda done, total, _: progress(done, total, f"Generando horario: día {done}/{total}")
+        schedule_df = generate_schedule(problem, progress=day_progress)
+    if search_budget <= 0:
+        return SearchResult(schedule_df, {}, {}, pd.DataFrame(), list(problem.days))
+    result = improve_schedule(problem, schedule_df, time_budget=search_budget, workers=search_workers, progress=progress)
+    return replace(result, replanned=list(problem.days))
+
+
+def plan_schedule(problem, search_budget=0.0, search_workers=None, progress=None, shard_workers=1, store_path=None,
+                  profile=False, profile_memory=False, hours_since=None):
+    """
+    generate_schedule + improve_schedule opcional, como un unico trabajo para background.py.
+    Con shard_workers > 1 el greedy corre por componentes de areas en paralelo (mismo resultado).
+    Con store_path se planifica contra el horario comprometido en SQLite (schedule_store.plan_rolling):
+    solo se calculan los dias nuevos o cambiados y el resultado queda guardado; hours_since es el inicio
+    del periodo de horas de contrato (None: el que elige plan_rolling).
+    Con profile el resultado trae en .perf el reporte de perf.py de esta corrida (tiempos por etapa,
+    contadores y, con profile_memory, picos de tracemalloc); los procesos hijos no se miden por dentro.
+    """
+    with perf.recording(profile, memory=profile_memory) as rec:
+        result = _plan_schedule(problem, search_budget, search_workers, progress, shard_workers, store_path, hours_since)
+    return result if rec is None else replace(result, perf=rec.report())
+
+
+@perf.timed("plan_schedule")
+def _plan_schedule(problem, search_budget, search_workers, progress, shard_workers, store_path, hours_since=None):
+    if store_path is None:
+        return _plan_window(problem, search_budget, search_workers, progress, shard_workers)
+    windows = []
+
+    def plan(sub, progress=None):
+        windows.append(_plan_window(sub, search_budget, search_workers, progress, shard_workers))
+        return windows[-1].schedule
+
+    with ScheduleStore(store_path) as store:
+        schedule_df, replanned = plan_rolling(store, problem, plan=plan, hours_since=hours_since, progress=progress)
+    if windows:
+        return replace(windows[-1], schedule=schedule_df, replanned=replanned)
+    return SearchResult(schedule_df, {}, {}, pd.DataFrame(), replanned)
@@ -0,0 +1,288 @@
+"""
+Horarios comprometidos en SQLite para planificar por ventanas (rolling horizon).
+
+Cada dia planificado se guarda con sus asignaciones, un digest de lo que produjo ese dia
+(requerimientos, turnos, limites y los operarios disponibles ese dia de la semana) y el inicio del
+horizonte desde el que cuentan sus horas de contrato. Al volver a planificar, los dias guardados con
+el mismo digest se reutilizan; desde el primer dia nuevo o cambiado se re-planifica arrastrando
+horas de contrato (desde el inicio de ese horizonte guardado), rachas de dias consecutivos y ultimos
+turnos de lo ya comprometido. Los dias guardados despues de la ventana dependen de ese estado y se
+re-planifican con ella.
+
+    with ScheduleStore("horarios.sqlite") as store:
+        schedule_df, replanned = plan_rolling(store, problem)
+
+La tabla operator_days acumula horas y jornada [inicio, fin) por (operario, fecha): cargar el estado
+de un mes es una consulta por indice, sin recorrer las asignaciones.
+"""
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import perf
+from schedule_lib import SCHEDULE_COLUMNS, WEEKDAYS, CarryState, as_roster, generate_schedule
+
+DEFAULT_STORE_PATH = "horarios.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assignments (
+    fecha TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    start_at TEXT,
+    end_at TEXT,
+    area TEXT,
+    turno TEXT,
+    operario TEXT,
+    horas REAL,
+    PRIMARY KEY (fecha, slot)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_assignments_operario_fecha ON assignments (operario, fecha);
+CREATE TABLE IF NOT EXISTS operator_days (
+    operario TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    horas REAL NOT NULL,
+    first_start TEXT,
+    last_end TEXT,
+    PRIMARY KEY (operario, fecha)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_operator_days_fecha ON operator_days (fecha, operario);
+CREATE TABLE IF NOT EXISTS plan_days (
+    fecha TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    horizon_start TEXT
+) WITHOUT ROWID;
+"""
+
+
+def problem_day_digests(problem):
+    """
+    {dia: digest} de lo que determina el plan de cada dia: requerimientos (en su orden), turnos usados,
+    areas, limites y los operarios disponibles ese dia de la semana (nombre, areas y contrato, en orden
+    de plantilla). Cambiar la disponibilidad de los sabados solo invalida los sabados.
+    """
+    req = [[sh, a, int(n)] for (sh, a), n in problem.req_matrix.items() if n > 0]
+    base = {
+        "req": req, "shifts": {sh: problem.shifts.get(sh) for sh, _, _ in req}, "areas": list(problem.areas),
+        "limits": [float(problem.max_hours_per_day), int(problem.max_consec_days), float(problem.min_rest_hours or 0)],
+    }
+    r = as_roster(problem.operators)
+    by_dow = {}
+    digests = {}
+    for d in problem.days:
+        w = WEEKDAYS.index(d.strftime("%a")[:3])
+        if w not in by_dow:
+            idx = np.flatnonzero(r.avail[:, w]).tolist()
+            codes = r.area_code.tolist()
+            roster = [[r.names[i], r.area_lists[codes[i]], float(r.contract[i])] for i in idx]
+            payload = json.dumps({**base, "roster": roster}, sort_keys=True, default=str)
+            by_dow[w] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        digests[d] = by_dow[w]
+    return digests
+
+
+def _iso(d):
+    return d.isoformat()
+
+
+def _iso_times(values):
+    """datetime64 -> texto 'AAAA-MM-DD HH:MM:SS' (ordenable); NaT -> None. Cada valor unico se formatea una vez."""
+    codes, uniques = pd.factorize(values)
+    text = [None if pd.isna(u) else str(pd.Timestamp(u)) for u in uniques]
+    return [None if c < 0 else text[c] for c in codes.tolist()]
+
+
+class ScheduleStore:
+    """Conexion SQLite con el horario comprometido; un lock serializa el uso desde varios hilos."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL" if path != ":memory:" else "PRAGMA journal_mode=MEMORY")
+        self._conn.executescript(_SCHEMA)
+        # Archivos creados antes de guardar el horizonte por dia
+        if "horizon_start" not in [row[1] for row in self._conn.execute("PRAGMA table_info(plan_days)")]:
+            self._conn.execute("ALTER TABLE plan_days ADD COLUMN horizon_start TEXT")
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def day_digests(self, days):
+        """{fecha: digest} de los dias ya comprometidos entre los pedidos."""
+        if not days:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fecha, digest FROM plan_days WHERE fecha BETWEEN ? AND ?", (_iso(min(days)), _iso(max(days)))
+            ).fetchall()
+        wanted = set(days)
+        found = {date.fromisoformat(f): g for f, g in rows}
+        return {d: g for d, g in found.items() if d in wanted}
+
+    def horizon_start(self, day):
+        """Inicio del horizonte con que se planifico day (None si day no esta guardado o es de un archivo antiguo)."""
+        with self._lock:
+            row = self._conn.execute("SELECT horizon_start FROM plan_days WHERE fecha = ?", (_iso(day),)).fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def last_day(self):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(fecha) FROM plan_days").fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    @perf.timed("ScheduleStore.load")
+    def load(self, start, end):
+        """Asignaciones comprometidas de start a end (inclusive), en el orden en que se generaron."""
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT fecha, start_at, end_at, area, turno, operario, horas FROM assignments "
+                "WHERE fecha BETWEEN ? AND ? ORDER BY fecha, slot",
+                self._conn, params=(_iso(start), _iso(end)),
+            )
+        if df.empty:
+            return pd.DataFrame([])
+        df.columns = SCHEDULE_COLUMNS
+        df["Fecha"] = [date.fromisoformat(f) for f in df["Fecha"]]
+        df["Start"] = pd.to_datetime(df["Start"])
+        df["End"] = pd.to_datetime(df["End"])
+        return df.infer_objects()
+
+    @perf.timed("ScheduleStore.commit")
+    def commit(self, schedule_df, digests, horizon_start=None):
+        """
+        Reemplaza los dias de digests ({fecha: digest}) por las filas de schedule_df de esos dias,
+        y actualiza los acumulados por operario y dia. horizon_start es el dia desde el que cuentan las
+        horas de contrato de esos dias; sin el, cada dia conserva el que tenia (o el primero de digests).
+        """
+        days = sorted(digests)
+        if not days:
+            return
+        rows = []
+        op_days = []
+        if schedule_df is not None and not schedule_df.empty:
+            df = schedule_df[SCHEDULE_COLUMNS]
+            df = df[pd.Series([f in digests for f in df["Fecha"]], index=df.index, dtype=bool)]
+            day_codes, day_values = pd.factorize(df["Fecha"])
+            fechas = [_iso(day_values[c]) for c in day_codes.tolist()]
+            slots = df.groupby(fechas, sort=False).cumcount().tolist()
+            start_dt = pd.to_datetime(df["Start"]).to_numpy()
+            end_dt = pd.to_datetime(df["End"]).to_numpy()
+            ops = [None if pd.isna(o) else str(o) for o in df["Operario"]]
+            rows = list(zip(fechas, slots, _iso_times(start_dt), _iso_times(end_dt), df["Área"].tolist(),
+                            df["Turno"].tolist(), ops, df["Horas"].astype(float).tolist()))
+            # min/max sobre datetime (no sobre texto) y a texto solo una fila por (operario, dia)
+            worked = pd.DataFrame({"operario": ops, "fecha": fechas, "horas": df["Horas"].astype(float).to_numpy(),
+                                   "start": start_dt, "end": end_dt}).dropna(subset=["operario"])
+            if not worked.empty:
+                acc = worked.groupby(["operario", "fecha"], sort=False).agg(
+                    horas=("horas", "sum"), first_start=("start", "min"), last_end=("end", "max")).reset_index()
+                op_days = list(zip(acc["operario"].tolist(), acc["fecha"].tolist(), acc["horas"].tolist(),
+                                   _iso_times(acc["first_start"].to_numpy()), _iso_times(acc["last_end"].to_numpy())))
+        perf.count("committed_rows", len(rows))
+        placeholders = ",".join("?" * len(days))
+        iso_days = [_iso(d) for d in days]
+        with self._lock, self._conn:
+            if horizon_start is None:
+                kept = dict(self._conn.execute(
+                    f"SELECT fecha, horizon_start FROM plan_days WHERE fecha IN ({placeholders})", iso_days).fetchall())
+                horizons = [kept.get(f) or iso_days[0] for f in iso_days]
+            else:
+                horizons = [_iso(horizon_start)] * len(iso_days)
+            self._conn.execute(f"DELETE FROM assignments WHERE fecha IN ({placeholders})", iso_days)
+            self._conn.execute(f"DELETE FROM operator_days WHERE fecha IN ({placeholders})", iso_days)
+            self._conn.executemany("INSERT INTO assignments VALUES (?,?,?,?,?,?,?,?)", rows)
+            self._conn.executemany("INSERT INTO operator_days VALUES (?,?,?,?,?)", op_days)
+            self._conn.executemany("INSERT OR REPLACE INTO plan_days VALUES (?,?,?)",
+                                   [(f, digests[d], h) for d, f, h in zip(days, iso_days, horizons)])
+
+    @perf.timed("ScheduleStore.carry_state")
+    def carry_state(self, first_day, max_consec_days, hours_since=None, rest_days=2):
+        """
+        CarryState para planificar desde first_day con lo comprometido antes:
+        horas desde hours_since (por defecto, el inicio del horizonte guardado de first_day; si no esta
+        guardado, ninguna), racha de dias trabajados hasta la vispera (hasta max_consec_days) y jornadas
+        de los ultimos rest_days dias.
+        """
+        if hours_since is None:
+            hours_since = self.horizon_start(first_day) or first_day
+        recent = first_day - timedelta(days=max(int(max_consec_days), int(rest_days)))
+        with self._lock:
+            # Las horas se suman en SQLite; solo los ultimos dias vuelven fila a fila
+            totals = self._conn.execute(
+                "SELECT operario, SUM(horas) FROM operator_days WHERE fecha >= ? AND fecha < ? GROUP BY operario",
+                (_iso(hours_since), _iso(first_day)),
+            ).fetchall()
+            rows = self._conn.execute(
+                "SELECT operario, fecha, first_start, last_end FROM operator_days WHERE fecha >= ? AND fecha < ?",
+                (_iso(recent), _iso(first_day)),
+            ).fetchall()
+        carry = CarryState(day=first_day, hours=dict(totals))
+        worked = {}
+        rest_from = _iso(first_day - timedelta(days=rest_days))
+        for op, fecha, first_start, last_end in rows:
+            worked.setdefault(op, set()).add(fecha)
+            if fecha >= rest_from and first_start and last_end:
+                carry.intervals.setdefault(op, []).append(
+                    (datetime.fromisoformat(first_start), datetime.fromisoformat(last_end)))
+        for op, fechas in worked.items():
+            run = 0
+            while run < max_consec_days and _iso(first_day - timedelta(days=run + 1)) in fechas:
+                run += 1
+            if run:
+                carry.streak[op] = run
+        return carry
+
+
+@perf.timed()
+def plan_rolling(store, problem, plan=generate_schedule, hours_since=None, progress=None):
+    """
+    Plan de problem.days reutilizando lo comprometido: los dias guardados con el mismo digest se cargan
+    del store y desde el primer dia nuevo o cambiado se llama a plan(sub_problema, progress=...) con
+    el estado arrastrado; el resultado se compromete. Los dias guardados despues de problem.days se
+    planificaron con el estado anterior, asi que se re-planifican y comprometen tambien (hasta el ultimo
+    dia guardado). Devuelve (horario de problem.days, dias re-planificados, incluidos esos posteriores).
+
+    Las horas de contrato cuentan desde hours_since; por defecto, si la ventana se superpone con lo
+    guardado, desde el inicio de ese horizonte (el del primer dia cambiado, o el de su vispera si
+    es de la ventana); si no, desde problem.days[0]. Asi re-planificar o extender una ventana da lo
+    mismo que planificar de una vez, y una ventana nueva abre su propio periodo de contrato.
+    """
+    days = sorted(problem.days)
+    if not days:
+        return pd.DataFrame([]), []
+    digests = problem_day_digests(problem)
+    stored = store.day_digests(days)
+    first = next((d for d in days if stored.get(d) != digests[d]), None)
+    if first is None:
+        return store.load(days[0], days[-1]), []
+    last = store.last_day()
+    later = [days[-1] + timedelta(days=k) for k in range(1, (last - days[-1]).days + 1)] if last and last > days[-1] else []
+    if later:
+        digests = problem_day_digests(dataclasses.replace(problem, days=days + later))
+    todo = [d for d in days if d >= first] + later
+    if hours_since is None:
+        hours_since = (store.horizon_start(first)
+                       or (store.horizon_start(first - timedelta(days=1)) if first > days[0] else None)
+                       or days[0])
+    carry = store.carry_state(first, problem.max_consec_days, hours_since)
+    fresh = plan(dataclasses.replace(problem, days=todo, carry=carry), progress=progress)
+    store.commit(fresh, {d: digests[d] for d in todo}, horizon_start=hours_since)
+    if later and not fresh.empty:
+        fresh = fresh[pd.Series([f <= days[-1] for f in fresh["Fecha"]], index=fresh.index, dtype=bool)]
+    kept = store.load(days[0], first - timedelta(days=1)) if first > days[0] else pd.DataFrame([])
+    parts = [df for df in (kept, fresh) if not df.empty]
+    if not parts:
+        return pd.DataFrame([]), todo
+    return pd.concat(parts, ignore_index=True).infer_objects(), todo
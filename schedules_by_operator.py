@@ -1,6 +1,6 @@
 # Planificador PRO — versión corregida (fix validate_schedule bug)
 # - Corrección en la función de validación para evitar unpacking/ValueError.
-# - El resto del archivo mantiene la lógica previa (heurístico, Gantt HTML/CSS, export CSV/XLSX fallback).
+# - El generador heurístico vive en schedule_lib.py; este archivo es la interfaz (Gantt HTML/CSS, export CSV/XLSX fallback).
 # Ejecutar: streamlit run schedules_by_operator.py
 
 import streamlit as st
@@ -12,6 +12,14 @@ import os
 import sys
 import importlib.util
 import traceback
+import time
+
+from schedule_lib import DEFAULT_SHIFTS, REST_WARNING_HOURS, ScheduleProblem, build_roster_from_df, IncrementalValidator
+from background import get_default_manager
+from schedule_search import plan_schedule
+from schedule_store import DEFAULT_STORE_PATH, ScheduleStore, problem_day_digests
+from gantt import LOD_LEVELS, build_gantt_html, gantt_windows
+import perf
 
 st.set_page_config(page_title="Planificador PRO — Gantt HTML/CSS (fix)", layout="wide")
 st.title("Planificador PRO — Gantt HTML/CSS (corrección)")
@@ -19,23 +27,6 @@ st.title("Planificador PRO — Gantt HTML/CSS (corrección)")
 # -------------------------
 # Utilidades
 # -------------------------
-def parse_avail(av_str):
-    if pd.isna(av_str) or str(av_str).strip() == "":
-        return set(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"])
-    tokens = [t.strip() for t in str(av_str).replace(";", ",").split(",") if t.strip()]
-    return set([tok[:3].title() for tok in tokens])
-
-def parse_areas(a_str):
-    if pd.isna(a_str) or str(a_str).strip() == "":
-        return []
-    return [x.strip() for x in str(a_str).replace(";", ",").split(",") if x.strip()]
-
-def hours_between(start_dt, end_dt):
-    return (end_dt - start_dt).total_seconds() / 3600.0
-
-def datetime_for_day_and_hour(day, hour):
-    return datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
-
 def df_to_excel_bytes_safe(df: pd.DataFrame) -> bytes | None:
     """
     Intenta crear un .xlsx en memoria usando xlsxwriter o openpyxl.
@@ -66,62 +57,6 @@ def df_to_excel_bytes_fallback(df: pd.DataFrame):
     excel_bytes = df_to_excel_bytes_safe(df)
     return excel_bytes, csv_bytes
 
-def color_for(text):
-    h = abs(hash(text)) % 360
-    return f"hsl({h},65%,40%)"
-
-def build_gantt_html(df_view, date_range_start, date_range_end):
-    """
-    Construye un HTML/CSS Gantt responsivo (sin dependencias externas)
-    df_view debe contener columnas: Área, Start (datetime), End (datetime), Operario, Turno, Horas
-    """
-    total_hours = max(1, int((date_range_end - date_range_start).total_seconds() / 3600))
-    gantt_css = f"""
-    <style>
-    .gantt-wrap {{ width:100%; overflow-x:auto; border:1px solid #ddd; padding:8px; background:#fff; }}
-    .gantt-row {{ display:flex; align-items:center; gap:8px; margin-bottom:6px; }}
-    .gantt-area {{ width:220px; flex:0 0 220px; font-weight:600; }}
-    .gantt-bar-area {{ position:relative; height:36px; flex:1 1 auto; background:#f6f6f6; border-radius:4px; border:1px solid #eee; }}
-    .gantt-item {{ position:absolute; height:28px; top:4px; border-radius:4px; padding:2px 6px; color:#fff; font-size:12px; overflow:hidden; white-space:nowrap; text-overflow:ellipsis; box-shadow: 0 1px 2px rgba(0,0,0,0.1);}}
-    .gantt-legend {{ display:flex; gap:8px; flex-wrap:wrap; margin-bottom:8px; }}
-    .gantt-legend div {{ padding:4px 8px; border-radius:4px; background:#efefef; font-size:12px; }}
-    </style>
-    """
-    html = gantt_css + "<div class='gantt-wrap'>"
-    # legend
-    unique_ops = df_view["Operario"].dropna().unique().tolist()
-    if len(unique_ops) > 0:
-        html += "<div class='gantt-legend'><div><b>Legend</b></div>"
-        for op in unique_ops[:50]:
-            col = color_for(op)
-            html += f"<div style='background:{col};color:white'>{op}</div>"
-        html += "</div>"
-    # rows
-    areas_order = list(df_view["Área"].unique())
-    for a in areas_order:
-        html += "<div class='gantt-row'>"
-        html += f"<div class='gantt-area'>{a}</div>"
-        html += "<div class='gantt-bar-area'>"
-        rows_a = df_view[df_view["Área"] == a]
-        for _, r in rows_a.iterrows():
-            s = pd.to_datetime(r["Start"])
-            e = pd.to_datetime(r["End"])
-            if e <= date_range_start or s >= date_range_end:
-                continue
-            s2 = max(s, date_range_start)
-            e2 = min(e, date_range_end)
-            left_hours = (s2 - date_range_start).total_seconds() / 3600.0
-            width_hours = (e2 - s2).total_seconds() / 3600.0
-            left_pct = 100.0 * left_hours / total_hours
-            width_pct = max(0.5, 100.0 * width_hours / total_hours)
-            op = r.get("Operario") or "VACANTE"
-            col = color_for(str(op))
-            title = f"{op} | {r.get('Turno')} | {s.strftime('%d-%b %H:%M')} → {e.strftime('%d-%b %H:%M')} | {r.get('Horas')}h"
-            html += f"<div class='gantt-item' title='{title}' style='left:{left_pct}%; width:{width_pct}%; background:{col};'>{op}</div>"
-        html += "</div></div>"
-    html += "</div>"
-    return html
-
 # -------------------------
 # Plantilla de operarios (lista proporcionada)
 # -------------------------
@@ -213,21 +148,7 @@ days = [(start_date + timedelta(days=i)) for i in range(num_days)]
 date_range_start = datetime.combine(days[0], datetime.min.time()) + timedelta(hours=6)
 date_range_end = datetime.combine(days[-1], datetime.min.time()) + timedelta(days=1, hours=6)
 
-# Turnos disponibles (definidos)
-default_shifts = {
-    "06-14": {"start":6, "end":14},
-    "07-15": {"start":7, "end":15},
-    "08-16": {"start":8, "end":16},
-    "09-17": {"start":9, "end":17},
-    "14-21": {"start":14, "end":21},
-    "18-00": {"start":18, "end":0},
-    "21-06": {"start":21, "end":6},
-    "AR_06-14": {"start":6, "end":14},
-    "AR_14-22": {"start":14, "end":22},
-    "AR_22-06": {"start":22, "end":6},
-    "SURF_06-21": {"start":6, "end":21},
-    "06-12": {"start":6, "end":12},
-}
+default_shifts = DEFAULT_SHIFTS
 
 # Areas
 unique_areas = sorted(set(df_ops["areas"].dropna().unique()))
@@ -269,117 +190,92 @@ if st.sidebar.button("Añadir temporales"):
 # Restricciones
 max_hours_per_day = st.sidebar.number_input("Horas máximas por día por operario", min_value=1, max_value=24, value=12)
 max_consec_days = st.sidebar.number_input("Máx. días consecutivos permitidos", min_value=1, max_value=7, value=6)
+min_rest_hours = st.sidebar.number_input("Descanso mínimo entre turnos (h, 0 = sin mínimo)", min_value=0, max_value=24, value=0)
+
+# Mejora opcional del plan greedy (búsqueda local en varios procesos)
+st.sidebar.header("Mejora por búsqueda local")
+search_budget = st.sidebar.number_input("Tiempo de búsqueda (s, 0 = sin mejora)", min_value=0, max_value=600, value=0)
+search_workers = st.sidebar.number_input("Procesos de búsqueda", min_value=1, max_value=max(1, os.cpu_count() or 1), value=max(1, min(4, os.cpu_count() or 1)))
+# Plan continuo: reutiliza los días ya comprometidos y arrastra horas/rachas entre ventanas
+st.sidebar.header("Horario guardado (SQLite)")
+use_store = st.sidebar.checkbox("Planificar sobre el horario guardado", value=False)
+store_path = st.sidebar.text_input("Archivo del horario guardado", value=DEFAULT_STORE_PATH) if use_store else None
+contract_start = st.sidebar.date_input(
+    "Inicio del periodo de horas de contrato", value=None,
+    help="Vacío: si la ventana se superpone con el horario guardado, el inicio de ese periodo; si no, la fecha de inicio.",
+) if use_store else None
+shard_workers = st.sidebar.number_input("Procesos de generación (por componentes de áreas)", min_value=1, max_value=max(1, os.cpu_count() or 1), value=1)
+# Tiempos por etapa y contadores (perf.py); apagado no agrega costo
+st.sidebar.header("Rendimiento")
+profile = st.sidebar.checkbox("Medir rendimiento por etapa", value=False)
+profile_memory = st.sidebar.checkbox("Medir también picos de memoria (más lento)", value=False) if profile else False
 
 # -------------------------
 # Construir lista interna de operarios
 # -------------------------
-def build_ops_from_df(df_ops_df):
-    ops = []
-    for _, row in df_ops_df.iterrows():
-        name = row.get("name")
-        if pd.isna(name) or not str(name).strip():
-            continue
-        ops.append({
-            "name": name,
-            "areas": parse_areas(row.get("areas","")),
-            "contract_hours": float(row.get("contract_hours",48)),
-            "availability": parse_avail(row.get("availability","Mon,Tue,Wed,Thu,Fri,Sat")),
-            "assigned_hours": 0.0,
-            "daily_hours": {},
-            "assigned_dates": set()
-        })
-    return ops
-
-ops = build_ops_from_df(df_ops)
+ops = build_roster_from_df(df_ops)
 
 st.write(f"Operarios cargados: {len(ops)}")
 # small table for quick reference
-st.dataframe(pd.DataFrame([{"name":o["name"], "areas":",".join(o["areas"]), "contract_hours":o["contract_hours"]} for o in ops]))
+st.dataframe(pd.DataFrame({"name": ops.names, "areas": [",".join(ops.area_lists[c]) for c in ops.area_code.tolist()],
+                           "contract_hours": ops.contract}))
 
 # -------------------------
 # Generador heurístico con validaciones
 # -------------------------
 st.header("Generar horario propuesto (interactivo y validado)")
 if st.button("Generar horario"):
-    schedule = []
-    # reset counters
-    for o in ops:
-        o["assigned_hours"] = 0.0
-        o["daily_hours"] = {}
-        o["assigned_dates"] = set()
+    problem = ScheduleProblem(
+        operators=ops, areas=areas, req_matrix=req_matrix, days=days, shifts=default_shifts,
+        max_hours_per_day=max_hours_per_day, max_consec_days=max_consec_days, min_rest_hours=min_rest_hours,
+    )
+    # La generación corre en un proceso aparte: la UI no se congela y tocar un widget no la reinicia
+    previous = st.session_state.get("schedule_job")
+    if previous is not None:
+        previous.cancel()
+    st.session_state["schedule_job"] = get_default_manager(processes=True).submit(
+        plan_schedule, problem, search_budget=float(search_budget), search_workers=int(search_workers),
+        shard_workers=int(shard_workers), store_path=store_path, profile=profile, profile_memory=profile_memory,
+        hours_since=contract_start,
+    )
+    st.session_state["schedule_problem"] = problem
 
-    ops_by_area = {}
-    for a in areas:
-        ops_by_area[a] = [o for o in ops if (a in o["areas"]) or (len(o["areas"])==0)]
-
-    for d in days:
-        dow = d.strftime("%a")[:3]
-        for (sh,a), needed in req_matrix.items():
-            if needed <= 0:
-                continue
-            sh_def = default_shifts.get(sh, {"start":6, "end":14})
-            s_start = sh_def["start"]
-            s_end = sh_def["end"]
-            start_dt = datetime.combine(d, datetime.min.time()) + timedelta(hours=s_start)
-            end_dt = datetime.combine(d, datetime.min.time()) + timedelta(hours=s_end)
-            if s_end <= s_start:
-                end_dt += timedelta(days=1)
-            shift_hours = hours_between(start_dt, end_dt)
-            for slot in range(int(needed)):
-                candidates = []
-                for o in ops_by_area.get(a, []):
-                    if dow not in o["availability"]:
-                        continue
-                    if d in o["assigned_dates"]:
-                        continue
-                    if o["daily_hours"].get(d, 0) + shift_hours > max_hours_per_day:
-                        continue
-                    # consecutive days check
-                    consec = 0
-                    for k in range(1, max_consec_days+1):
-                        if (d - timedelta(days=k)) in o["assigned_dates"]:
-                            consec += 1
-                        else:
-                            break
-                    if consec >= max_consec_days:
-                        continue
-                    if o["assigned_hours"] + shift_hours <= o["contract_hours"]:
-                        candidates.append((0, o))
-                    else:
-                        candidates.append((1, o))
-                if not candidates:
-                    # relax rules: allow if available and not double assigned today and not exceed daily max
-                    for o in ops_by_area.get(a, []):
-                        dow_ok = d.strftime("%a")[:3] in o["availability"]
-                        if not dow_ok:
-                            continue
-                        if d in o["assigned_dates"]:
-                            continue
-                        if o["daily_hours"].get(d,0) + shift_hours <= max_hours_per_day:
-                            candidates.append((2, o))
-                if not candidates:
-                    schedule.append({
-                        "Fecha": d, "Start": start_dt, "End": end_dt, "Área": a, "Turno": sh, "Operario": None, "Horas": shift_hours
-                    })
-                    continue
-                chosen = sorted(candidates, key=lambda x: (x[0], x[1]["assigned_hours"]))[0][1]
-                chosen["assigned_hours"] += shift_hours
-                chosen["daily_hours"][d] = chosen["daily_hours"].get(d, 0) + shift_hours
-                chosen["assigned_dates"].add(d)
-                schedule.append({
-                    "Fecha": d, "Start": start_dt, "End": end_dt, "Área": a, "Turno": sh, "Operario": chosen["name"], "Horas": shift_hours
-                })
+job = st.session_state.get("schedule_job")
+if job is not None:
+    if not job.done():
+        st.progress(job.fraction)
+        st.caption(job.message or "Generando horario...")
+        if st.button("Cancelar generación"):
+            job.cancel()
+        time.sleep(0.5)
+        st.rerun() if hasattr(st, "rerun") else st.experimental_rerun()
+    del st.session_state["schedule_job"]
+    if job.status == "done":
+        # El horario queda en session_state: las ediciones del data_editor provocan un rerun sin el botón
+        result = job.result()
+        st.session_state["schedule"] = result.schedule
+        st.session_state["schedule_search"] = result
+        st.session_state["schedule_version"] = st.session_state.get("schedule_version", 0) + 1
+        st.session_state["schedule_validator"] = IncrementalValidator()
+    elif job.status == "cancelled":
+        st.warning("Generación cancelada.")
+    else:
+        st.error(f"Error generando el horario: {job.error}")
 
-    df_schedule = pd.DataFrame(schedule)
+if "schedule" in st.session_state:
+    df_schedule = st.session_state["schedule"]
+    # Validacion, Gantt y export de este rerun se miden aqui; la generacion, en el proceso del trabajo
+    ui_perf = perf.Recorder(memory=profile_memory) if profile else None
+    editor_key = f"schedule_editor_{st.session_state['schedule_version']}"
 
     # Editable table if available
     st.subheader("Horario propuesto (edítalo si tu Streamlit lo soporta)")
     edited = None
     try:
         if hasattr(st, "experimental_data_editor"):
-            edited = st.experimental_data_editor(df_schedule, num_rows="dynamic")
+            edited = st.experimental_data_editor(df_schedule, num_rows="dynamic", key=editor_key)
         elif hasattr(st, "data_editor"):
-            edited = st.data_editor(df_schedule, num_rows="dynamic")
+            edited = st.data_editor(df_schedule, num_rows="dynamic", key=editor_key)
         else:
             st.dataframe(df_schedule)
     except Exception:
@@ -388,49 +284,32 @@ if st.button("Generar horario"):
     if edited is not None:
         df_schedule = edited.copy()
 
+    search = st.session_state.get("schedule_search")
+    if store_path and search is not None:
+        in_window = [d for d in search.replanned if d <= days[-1]]
+        st.caption(f"Días re-planificados: {len(in_window)} de {num_days} (el resto se cargó del horario guardado).")
+        if len(in_window) < len(search.replanned):
+            st.caption(f"También se re-planificaron {len(search.replanned) - len(in_window)} días guardados posteriores, "
+                       "que dependían de los cambiados.")
+        problem = st.session_state.get("schedule_problem")
+        if problem is not None and st.button("Guardar ediciones en el horario guardado"):
+            with ScheduleStore(store_path) as store:
+                store.commit(df_schedule, problem_day_digests(problem))
+            st.success("Horario guardado.")
+
     # --------- Validaciones ----------
-    def validate_schedule(df_sch, max_hours_day, max_consec):
-        issues = []
-        by_op = {}
-        for idx, r in df_sch.iterrows():
-            op = r.get("Operario")
-            if pd.isna(op) or op is None:
-                continue
-            name = str(op)
-            fecha = pd.to_datetime(r["Fecha"]).date() if not pd.isna(r["Fecha"]) else None
-            hrs = float(r.get("Horas", 0))
-            by_op.setdefault(name, []).append((fecha, hrs))
-        for name, entries in by_op.items():
-            # entries: list of (fecha, hrs)
-            daily = {}
-            dates = []
-            for fecha, hrs in entries:
-                daily[fecha] = daily.get(fecha, 0.0) + hrs
-                if fecha is not None:
-                    dates.append(fecha)
-            # check daily hours
-            for d, hsum in daily.items():
-                if hsum > max_hours_day + 1e-6:
-                    issues.append({"type":"daily_hours", "operario":name, "fecha":d, "horas":hsum})
-            # check double shifts (more than one assignment same date)
-            for d in daily.keys():
-                count = sum(1 for (f,_) in entries if f == d)
-                if count > 1:
-                    issues.append({"type":"double_shift", "operario":name, "fecha":d, "count":count})
-            # consecutive days
-            date_list = sorted(set(dates))
-            if date_list:
-                consec = 1
-                for i in range(1, len(date_list)):
-                    if (date_list[i] - date_list[i-1]).days == 1:
-                        consec += 1
-                        if consec > max_consec:
-                            issues.append({"type":"consec_days", "operario":name, "hasta_fecha":date_list[i], "consec":consec})
-                    else:
-                        consec = 1
-        return issues
+    if search is not None and search.after:
+        with st.expander("Búsqueda local: objetivo antes/después y rendimiento por proceso"):
+            st.dataframe(pd.DataFrame([search.before, search.after], index=["Greedy", "Mejorado"]))
+            st.dataframe(search.workers)
 
-    issues = validate_schedule(df_schedule, max_hours_per_day, max_consec_days)
+    # Solo se revalidan los operarios de las filas editadas desde el último rerun
+    validator = st.session_state.setdefault("schedule_validator", IncrementalValidator())
+    with perf.recording(ui_perf):
+        issues = validator.validate(df_schedule, max_hours_per_day, max_consec_days, min_rest_hours)
+    # short_rest es solo un aviso: no cuenta como conflicto
+    warnings = [it for it in issues if it["type"] == "short_rest"]
+    issues = [it for it in issues if it["type"] != "short_rest"]
     if issues:
         st.error("Se detectaron conflictos/validaciones en el horario:")
         for it in issues:
@@ -440,8 +319,15 @@ if st.button("Generar horario"):
                 st.warning(f"Operario {it['operario']} tiene {it['count']} asignaciones el día {it['fecha']} (posible doble turno).")
             elif it["type"] == "consec_days":
                 st.warning(f"Operario {it['operario']} excede días consecutivos ({it['consec']}) hasta {it['hasta_fecha']}.")
+            elif it["type"] == "overlap":
+                st.warning(f"Operario {it['operario']} tiene un turno el día {it['fecha']} que se solapa {it['horas']:.1f} h con el turno anterior.")
+            elif it["type"] == "rest":
+                st.warning(f"Operario {it['operario']} descansa solo {it['descanso']:.1f} h antes del turno del día {it['fecha']} (mín {min_rest_hours}).")
     else:
         st.success("Horario validado: no se detectaron conflictos críticos.")
+    for it in warnings:
+        st.warning(f"Aviso: operario {it['operario']} descansa solo {it['descanso']:.1f} h antes del turno del día {it['fecha']} "
+                   f"(menos de {REST_WARNING_HOURS} h; sube el descanso mínimo para impedirlo).")
 
     # -------------------------
     # Vista filtrada y Gantt (HTML)
@@ -458,7 +344,14 @@ if st.button("Generar horario"):
         st.subheader("Vista filtrada")
         st.dataframe(df_view.sort_values(["Fecha","Start"]))
         if not df_view.empty:
-            html = build_gantt_html(df_view, date_range_start, date_range_end)
+            # Gantt por ventanas de fechas: solo se arma y se envía al navegador la página elegida
+            lod = st.sidebar.selectbox("Nivel de detalle Gantt", options=LOD_LEVELS, index=0)
+            days_per_page = st.sidebar.number_input("Días por página del Gantt", min_value=1, max_value=31, value=7)
+            windows = gantt_windows(date_range_start, date_range_end, days_per_page)
+            page = st.selectbox("Ventana del Gantt", options=range(len(windows)),
+                                format_func=lambda i: f"{windows[i][0]:%d-%b} → {windows[i][1]:%d-%b}")
+            with perf.recording(ui_perf):
+                html = build_gantt_html(df_view, *windows[page], lod=lod)
             st.markdown(html, unsafe_allow_html=True)
         else:
             st.info("No hay filas en la vista filtrada.")
@@ -469,11 +362,21 @@ if st.button("Generar horario"):
     # Descargas: CSV siempre + XLSX si disponible
     # -------------------------
     if not df_schedule.empty:
-        excel_bytes, csv_bytes = df_to_excel_bytes_fallback(df_schedule)
+        with perf.recording(ui_perf), perf.span("excel_export"):
+            excel_bytes, csv_bytes = df_to_excel_bytes_fallback(df_schedule)
         st.download_button("Descargar CSV", data=csv_bytes, file_name="horario_propuesto.csv", mime="text/csv")
         if excel_bytes is not None:
             st.download_button("Descargar Excel (.xlsx)", data=excel_bytes, file_name="horario_propuesto.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
         else:
             st.warning("No hay motor Excel instalado (xlsxwriter/openpyxl). Se ofrece descarga CSV. Instale 'xlsxwriter' o 'openpyxl' para habilitar .xlsx.")
+
+    if ui_perf is not None:
+        report = perf.merge_reports(getattr(search, "perf", None), ui_perf.report())
+        with st.expander("Rendimiento por etapa"):
+            spans_df, counters_df = perf.report_frames(report)
+            st.dataframe(spans_df)
+            st.dataframe(counters_df)
+            st.download_button("Descargar rendimiento (JSON)", perf.to_json(report).encode("utf-8"),
+                               file_name="rendimiento.json", mime="application/json")
 else:
     st.info("Ajusta parámetros y pulsa 'Generar horario' para crear la propuesta.")
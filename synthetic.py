@@ -0,0 +1,155 @@
+"""
+Datos sinteticos para benchmarks y pruebas manuales: Horarios por area (CSV ';' / XLSX), Jobs CSV,
+plantillas de operarios y req_matrix, a varias escalas (SCALES), todo reproducible por semilla.
+
+    python synthetic.py --scale grande --out datos/
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from assign_lib import KNOWN_AREAS
+from schedule_lib import DEFAULT_SHIFTS, WEEKDAYS, ScheduleProblem, build_roster_from_df
+
+PLANT_AREAS = ["ANTI-REFLEJO", "BISEL Y MONTAJE", "CONTROL DE CALIDAD", "CAPA DURA", "COLORACION", "TALLA DIGITAL", "BODEGA"]
+DAY_SHIFTS = ["06-14", "07-15", "08-16", "09-17", "14-21"]
+
+# operators/days: planificador; horario_hours/jobs: Horario por area (las horas son columnas consecutivas)
+SCALES = {
+    "actual": {"operators": 60, "days": 14, "horario_hours": 24, "jobs": 200},
+    "mediana": {"operators": 500, "days": 14, "horario_hours": 168, "jobs": 5000},
+    "grande": {"operators": 2000, "days": 31, "horario_hours": 744, "jobs": 50000},
+    "maxima": {"operators": 5000, "days": 31, "horario_hours": 744, "jobs": 200000},
+}
+
+
+def horario_rows(areas=None, hours=24, seed=0, load=0.8, noise=0.0):
+    """
+    Filas de un Horario: por area, fila de horas, "Capacidad" y "Capacidad job" (load = demanda/capacidad media).
+    noise es la fraccion de celdas con formato sucio ("12,5", "x8", vacias) como en los archivos reales.
+    """
+    rng = np.random.default_rng(seed)
+    areas = sorted(KNOWN_AREAS) if areas is None else list(areas)
+    rows = []
+    for area in areas:
+        cap = rng.integers(5, 40, size=hours).astype(float)
+        job = np.round(cap * rng.uniform(0.2, 2 * load, size=hours), 1)
+        cap_cells = [f"{v:g}" for v in cap]
+        job_cells = [f"{v:g}".replace(".", ",") for v in job]
+        if noise > 0:
+            for cells in (cap_cells, job_cells):
+                for k in np.flatnonzero(rng.random(hours) < noise):
+                    cells[k] = rng.choice(["", f"x{cells[k]}", f"{cells[k]} "])
+        rows.append([area, ""] + [str(h) for h in range(hours)])
+        rows.append(["Capacidad", ""] + cap_cells)
+        rows.append(["Capacidad job", ""] + job_cells)
+    return rows
+
+
+def write_horario_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("\n".join(";".join(r) for r in rows) + "\n")
+    return path
+
+
+def write_horario_xlsx(path, rows):
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+    return path
+
+
+def jobs_frame(n_jobs, areas=None, hours=24, seed=0, priority=False):
+    """Jobs CSV: JobID, Area, StartHour, Duration, Quantity (y Priority opcional)."""
+    rng = np.random.default_rng(seed)
+    areas = sorted(KNOWN_AREAS) if areas is None else list(areas)
+    start = rng.integers(0, hours, size=n_jobs)
+    df = pd.DataFrame({
+        "JobID": np.arange(1, n_jobs + 1),
+        "Area": np.asarray(areas, dtype=object)[rng.integers(0, len(areas), size=n_jobs)],
+        "StartHour": start,
+        "Duration": np.minimum(rng.integers(1, 5, size=n_jobs), hours - start),
+        "Quantity": rng.integers(1, 40, size=n_jobs),
+    })
+    if priority:
+        df["Priority"] = rng.integers(1, 4, size=n_jobs)
+    return df
+
+
+def roster_frame(n_ops, areas=PLANT_AREAS, seed=0, temps=0):
+    """
+    Plantilla con las columnas de schedules_by_operator.py: la mayoria de una sola area, algunos
+    polivalentes, unos pocos sin area (cubren todas) y temps filas TEMP_<AREA>_<n> disponibles toda la semana.
+    """
+    rng = random.Random(seed)
+    availabilities = [",".join(WEEKDAYS[:6]), ",".join(WEEKDAYS), ",".join(WEEKDAYS[:5]), "Mon,Wed,Fri,Sat"]
+    rows = []
+    for i in range(n_ops):
+        k = rng.random()
+        op_areas = "" if k < 0.02 else (",".join(rng.sample(areas, 2)) if k < 0.15 else rng.choice(areas))
+        rows.append({"name": f"OPERARIO {i + 1:05d}", "areas": op_areas,
+                     "contract_hours": rng.choice([48, 48, 48, 40, 24]), "availability": rng.choice(availabilities)})
+    for i in range(temps):
+        area = areas[i % len(areas)]
+        rows.append({"name": f"TEMP_{area}_{n_ops + i + 1}", "areas": area, "contract_hours": 48,
+                     "availability": ",".join(WEEKDAYS)})
+    return pd.DataFrame(rows)
+
+
+def req_matrix_for(roster_df, areas=PLANT_AREAS, shifts=DAY_SHIFTS, seed=0, coverage=0.7):
+    """Requerimiento por (turno, area) proporcional a la gente de cada area (coverage ~ fraccion cubierta por dia)."""
+    rng = random.Random(seed)
+    req = {}
+    for a in areas:
+        people = int((roster_df["areas"].str.split(",").map(lambda lst: a in lst)).sum())
+        chosen = rng.sample(shifts, min(len(shifts), 2 + rng.randrange(2)))
+        per_shift = max(1, round(coverage * people / len(chosen)))
+        for sh in chosen:
+            req[(sh, a)] = per_shift
+    return req
+
+
+def schedule_problem(scale="actual", seed=0, start=date(2025, 12, 1), temps=None, min_rest_hours=0):
+    """ScheduleProblem de la escala pedida (plantilla + req_matrix + dias)."""
+    size = SCALES[scale]
+    temps = max(1, size["operators"] // 20) if temps is None else temps
+    roster_df = roster_frame(size["operators"], seed=seed, temps=temps)
+    return ScheduleProblem(
+        operators=build_roster_from_df(roster_df), areas=list(PLANT_AREAS),
+        req_matrix=req_matrix_for(roster_df, seed=seed), days=[start + timedelta(days=i) for i in range(size["days"])],
+        shifts=dict(DEFAULT_SHIFTS), min_rest_hours=min_rest_hours,
+    )
+
+
+def write_dataset(out_dir, scale="actual", seed=0):
+    """Escribe horario.csv, horario.xlsx, jobs.csv y operarios.csv de una escala; devuelve sus rutas."""
+    size = SCALES[scale]
+    os.makedirs(out_dir, exist_ok=True)
+    rows = horario_rows(hours=size["horario_hours"], seed=seed, noise=0.01)
+    paths = {
+        "horario_csv": write_horario_csv(os.path.join(out_dir, "horario.csv"), rows),
+        "horario_xlsx": write_horario_xlsx(os.path.join(out_dir, "horario.xlsx"), rows),
+        "jobs": os.path.join(out_dir, "jobs.csv"),
+        "roster": os.path.join(out_dir, "operarios.csv"),
+    }
+    jobs_frame(size["jobs"], hours=size["horario_hours"], seed=seed).to_csv(paths["jobs"], index=False)
+    roster_frame(size["operators"], seed=seed, temps=max(1, size["operators"] // 20)).to_csv(paths["roster"], index=False)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sinteticos de Horario, Jobs y plantilla.")
+    parser.add_argument("--scale", default="actual", choices=list(SCALES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="datos_sinteticos")
+    args = parser.parse_args(argv)
+    for name, path in write_dataset(args.out, args.scale, args.seed).items():
+        print(f"{name}\t{path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())